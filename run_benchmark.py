@@ -0,0 +1,226 @@
+import argparse
+import csv
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing.synchronize import Barrier
+from typing import Callable
+from colorama import Fore, Style
+
+# backend name: source tree whose benchmark module plays the games
+BACKENDS = {
+    "python": "src",
+    "numba": "src_numba",
+}
+
+GAMES_COUNT = 20
+MINIMAX_DEPTH = 2
+MCTS_SIMULATIONS = 20
+
+# name: (title, BLACK player, WHITE player)
+MATCHUPS = {
+    "random-random": ("Random vs Random", "random", "random"),
+    "minimax-random": ("BLACK Minimax vs WHITE Random", "minimax", "random"),
+    "random-minimax": ("WHITE Minimax vs BLACK Random", "random", "minimax"),
+    "minimax-minimax": ("Minimax vs Minimax", "minimax", "minimax"),
+    "mcts-random": ("BLACK MCTS vs WHITE Random", "mcts", "random"),
+    "random-mcts": ("WHITE MCTS vs BLACK Random", "random", "mcts"),
+    "mcts-mcts": ("MCTS vs MCTS", "mcts", "mcts"),
+    "minimax-mcts": ("BLACK Minimax vs WHITE MCTS", "minimax", "mcts"),
+    "mcts-minimax": ("WHITE Minimax vs BLACK MCTS", "mcts", "minimax"),
+}
+
+FIELDS = (
+    "matchup",
+    "games",
+    "black_wins",
+    "white_wins",
+    "draws",
+    "black_win_rate",
+    "white_win_rate",
+    "draw_rate",
+    "wall_time",
+    "moves",
+    "time_per_move",
+    "p50_move_latency",
+    "p99_move_latency",
+    "black_nodes_per_second",
+    "white_nodes_per_second",
+)
+
+# final state in the backend's own type, latency of every AI move, then the nodes and seconds of the
+# [BLACK, WHITE] AIs of a played game
+GameResult = tuple[object, list[float], list[int], list[float]]
+
+
+def load_backend(name: str):
+    """Imports the benchmark module of the backend's source tree, which plays the games.
+
+    The module gives BLACK_WON and WHITE_WON in its own state type, `warm_up()` for every worker
+    and `benchmark_game(task)` returning a GameResult.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), BACKENDS[name]))
+    return importlib.import_module("benchmark")
+
+
+def run_benchmarks(
+    backend: str,
+    matchups: list[str],
+    games: int,
+    depth: int,
+    iterations: int,
+    seed: int,
+    workers: int,
+    book: str | None = None,
+    endgame_cache: str | None = None,
+    playouts: int = 1,
+) -> list[dict]:
+    """Plays every matchup with its games spread over a pool of worker processes and returns their statistics.
+
+    The AIs play the moves of the opening book file `book` when there is one. Python minimax looks endgames
+    up in the `endgame_cache` file and records the ones it solves to `endgame_cache` + ".journal".
+    Numba MCTS simulates `playouts` games from every leaf.
+    """
+    module = load_backend(backend)
+    results = []
+    ready = multiprocessing.Barrier(workers + 1)
+    with multiprocessing.Pool(workers, initializer=_start_worker, initargs=(module.warm_up, ready)) as pool:
+        ready.wait()  # every worker is ready, compiled for Numba, before the clock starts
+        for matchup in matchups:
+            _, black, white = MATCHUPS[matchup]
+            tasks = [
+                (black, white, depth, iterations, playouts, f"{seed}:{matchup}:{i}", book, endgame_cache)
+                for i in range(games)
+            ]
+            start_time = time.perf_counter()
+            played = pool.map(module.benchmark_game, tasks)
+            wall_time = time.perf_counter() - start_time
+            results.append(statistics(matchup, played, wall_time, module.BLACK_WON, module.WHITE_WON))
+    return results
+
+
+def _start_worker(warm_up: Callable[[], None], ready: Barrier) -> None:
+    """Warms up a worker process, then waits at the `ready` barrier the parent passes once every worker is done."""
+    warm_up()
+    ready.wait()
+
+
+def statistics(matchup: str, played: list[GameResult], wall_time: float, black_won: object, white_won: object) -> dict:
+    """Returns the statistics of the games played in a matchup.
+
+    `black_won` and `white_won` are the final states of the games won by BLACK and by WHITE in the backend's type.
+    """
+    games = len(played)
+    latencies = sorted(latency for _, game_latencies, _, _ in played for latency in game_latencies)
+    black_wins = sum(state == black_won for state, _, _, _ in played)
+    white_wins = sum(state == white_won for state, _, _, _ in played)
+    draws = games - black_wins - white_wins
+    return {
+        "matchup": matchup,
+        "games": games,
+        "black_wins": black_wins,
+        "white_wins": white_wins,
+        "draws": draws,
+        "black_win_rate": black_wins / games,
+        "white_win_rate": white_wins / games,
+        "draw_rate": draws / games,
+        "wall_time": wall_time,
+        "moves": len(latencies),
+        "time_per_move": sum(latencies) / len(latencies) if latencies else None,
+        "p50_move_latency": _percentile(latencies, 50),
+        "p99_move_latency": _percentile(latencies, 99),
+        "black_nodes_per_second": _nodes_per_second(played, 0),
+        "white_nodes_per_second": _nodes_per_second(played, 1),
+    }
+
+
+def _nodes_per_second(played: list[GameResult], side: int) -> float | None:
+    """Nodes per second of the BLACK (0) or WHITE (1) player over the games, None for the random player.
+
+    The nodes are what the player's engine counts: positions for minimax, MCTS iterations or playouts.
+    Minimax moves solved by the endgame solver count no nodes, so their time is left out.
+    """
+    nodes = sum(game_nodes[side] for _, _, game_nodes, _ in played)
+    seconds = sum(game_seconds[side] for _, _, _, game_seconds in played)
+    return nodes / seconds if nodes and seconds > 0 else None
+
+
+def _percentile(values: list[float], percent: int) -> float | None:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, -(-percent * len(values) // 100) - 1))]
+
+
+def print_results(results: list[dict], output_format: str, output) -> None:
+    if output_format == "json":
+        json.dump(results, output, indent=2)
+        output.write("\n")
+    elif output_format == "csv":
+        writer = csv.DictWriter(output, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    else:
+        for result in results:
+            games = result["games"]
+            print(f"{Fore.BLUE}{MATCHUPS[result['matchup']][0]}:{Style.RESET_ALL}", file=output)
+            print(f"  elapsed time: {result['wall_time']:.2f}s", file=output)
+            if result["moves"]:
+                print(
+                    f"  move latency: {result['time_per_move'] * 1000:.2f}ms mean"
+                    f"  {result['p50_move_latency'] * 1000:.2f}ms p50"
+                    f"  {result['p99_move_latency'] * 1000:.2f}ms p99",
+                    file=output,
+                )
+            print(f"    BLACK wins: {result['black_wins']} {result['black_wins'] / games * 100:.0f}%", file=output)
+            print(f"    WHITE wins: {result['white_wins']} {result['white_wins'] / games * 100:.0f}%", file=output)
+            print(f"         draws: {result['draws']} {result['draws'] / games * 100:.0f}%\n", file=output)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Othello AIs against each other.")
+    parser.add_argument("--backend", choices=BACKENDS, default="python", help="engine that plays the games")
+    parser.add_argument("--matchups", nargs="+", choices=MATCHUPS, default=list(MATCHUPS), help="matchups to play")
+    parser.add_argument("--games", type=int, default=GAMES_COUNT, help="games per matchup")
+    parser.add_argument("--depth", type=int, default=MINIMAX_DEPTH, help="minimax search depth")
+    parser.add_argument("--iterations", type=int, default=MCTS_SIMULATIONS, help="MCTS iterations per move")
+    parser.add_argument("--playouts", type=int, default=1, help="MCTS playouts per leaf run in parallel, numba only")
+    parser.add_argument("--seed", type=int, default=0, help="seed the games are derived from")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--format", choices=("text", "json", "csv"), default="text", help="output format")
+    parser.add_argument("--book", help="opening book file for the AIs")
+    parser.add_argument(
+        "--endgame-cache", help="endgame cache file for minimax, merged with src/merge_cache.py, python only"
+    )
+    parser.add_argument("--output", type=argparse.FileType("w"), default=sys.stdout, help="output file")
+    args = parser.parse_args()
+    if args.backend != "numba" and args.playouts != 1:
+        parser.error("--playouts needs the numba backend")
+    if args.backend != "python" and args.endgame_cache is not None:
+        parser.error("--endgame-cache needs the python backend")
+
+    if args.format == "text":
+        print(f"{Fore.MAGENTA}Running {args.backend} benchmarks...{Style.RESET_ALL}\n")
+    start_time = time.time()
+    results = run_benchmarks(
+        args.backend,
+        args.matchups,
+        args.games,
+        args.depth,
+        args.iterations,
+        args.seed,
+        args.workers,
+        args.book,
+        args.endgame_cache,
+        args.playouts,
+    )
+    print_results(results, args.format, args.output)
+    if args.format == "text":
+        print(f"{Fore.MAGENTA}Total time elapsed: {time.time() - start_time:.2f}{Style.RESET_ALL}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import importlib
+import os
+import sys
+import time
+from colorama import Fore, Style
+
+# backend name: source tree whose perft module counts the moves
+BACKENDS = {
+    "python": "src",
+    "numba": "src_numba",
+}
+
+PERFT_DEPTH = 6
+
+# name: (board rows from y = 0 with X black, O white and - empty, player to move, leaf counts by depth)
+# a pass is a ply of its own and a finished game a leaf, every backend has to reach the same counts
+POSITIONS = {
+    "start": (
+        "--------" "--------" "--------" "---OX---" "---XO---" "--------" "--------" "--------",
+        "X",
+        (1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288, 24571284),
+    ),
+    "midgame": (
+        "-O-X----" "--OX----" "---XO---" "--XXO---" "-XXXO---" "-XOXO---" "OO-OOX--" "O---O---",
+        "X",
+        (1, 11, 133, 1464, 16834, 186331, 2131394),
+    ),
+    "passes": (
+        "--------" "---O----" "XO-OO-O-" "XOOOXOX-" "-OXOOO--" "OOOXOO--" "XOXOO---" "-XXXXX--",
+        "X",
+        (1, 13, 93, 1211, 9724, 121830, 1076979),
+    ),
+    "endgame": (
+        "XXXXXXXX" "-XO-OOXX" "XOXOOOXX" "XOOXOXOX" "XOXOOOOO" "XXXXOOX-" "-XXXO-X-" "--XXXOOO",
+        "X",
+        (1, 3, 19, 59, 234, 619, 1381, 1949, 2042, 2079, 2079),
+    ),
+}
+
+
+def load_backend(name: str):
+    """Imports the perft module of the backend's source tree.
+
+    The module gives `parse_position(board, player)` and `perft(position, depth)` for the positions it sets up.
+    """
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), BACKENDS[name]))
+    return importlib.import_module("perft")
+
+
+def run_perft(backend: str, names: list[str], depth: int) -> bool:
+    """Runs perft to the given depth on every named position and prints the counts. Returns False on a mismatch."""
+    module = load_backend(backend)
+    module.perft(module.parse_position(*POSITIONS["start"][:2]), 2)  # compile Numba before timing
+
+    passed = True
+    for name in names:
+        board, player, counts = POSITIONS[name]
+        print(f"{Fore.BLUE}{name}:{Style.RESET_ALL}")
+        for current_depth in range(1, depth + 1):
+            position = module.parse_position(board, player)
+            start_time = time.perf_counter()
+            nodes = module.perft(position, current_depth)
+            elapsed = time.perf_counter() - start_time
+            if current_depth >= len(counts):
+                check = ""
+            elif nodes == counts[current_depth]:
+                check = f"{Fore.GREEN}ok{Style.RESET_ALL}"
+            else:
+                check = f"{Fore.RED}expected {counts[current_depth]}{Style.RESET_ALL}"
+                passed = False
+            nodes_per_second = nodes / elapsed if elapsed > 0 else float("inf")
+            print(
+                f"  depth {current_depth:2}: {nodes:12} nodes {elapsed:8.3f}s {nodes_per_second:12.0f} nodes/s  {check}"
+            )
+    return passed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Count the leaves of the Othello game tree to check and time move generation."
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="python", help="move generation to count")
+    parser.add_argument(
+        "--positions", nargs="+", choices=POSITIONS, default=list(POSITIONS), help="positions to search"
+    )
+    parser.add_argument("--depth", type=int, default=PERFT_DEPTH, help="deepest depth to count")
+    args = parser.parse_args()
+
+    if not run_perft(args.backend, args.positions, args.depth):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
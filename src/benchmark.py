@@ -1,78 +1,91 @@
-import time
+import os
 import random
+import sys
+import time
 from core.othello import Othello, State
-from core.minimax import minimax_move
-from core.mcts import mcts_move
-from colorama import Fore, Style
+from core.minimax import minimax_move, SearchStats
+from core.transposition import TranspositionTable
+from core.mcts import MCTSPlayer, MCTSStats
+from core.book import OpeningBook
+from core.endgame_cache import EndgameCache
 from typing import Callable
 
-GAMES_COUNT = 20
-MINIMAX_DEPTH = 2
-MCTS_SIMULATIONS = 20
-
-
-def run_benchmarks() -> None:
-    print(f"{Fore.MAGENTA}Running benchmarks...{Style.RESET_ALL}\n")
-    start_time = time.time()
-
-    print(f"{Fore.BLUE}Random vs Random:{Style.RESET_ALL}")
-    benchmark_game(random_move, random_move)
-
-    print(f"{Fore.BLUE}BLACK Minimax vs WHITE Random:{Style.RESET_ALL}")
-    benchmark_game(lambda game: minimax_move(game, MINIMAX_DEPTH), random_move)
-
-    print(f"{Fore.BLUE}WHITE Minimax vs BLACK Random:{Style.RESET_ALL}")
-    benchmark_game(random_move, lambda game: minimax_move(game, MINIMAX_DEPTH))
-
-    print(f"{Fore.BLUE}Minimax vs Minimax:{Style.RESET_ALL}")
-    benchmark_game(lambda game: minimax_move(game, MINIMAX_DEPTH), lambda game: minimax_move(game, MINIMAX_DEPTH))
-
-    print(f"{Fore.BLUE}BLACK MCTS vs WHITE Random:{Style.RESET_ALL}")
-    benchmark_game(lambda game: mcts_move(game, MCTS_SIMULATIONS), random_move)
-
-    print(f"{Fore.BLUE}WHITE MCTS vs BLACK Random:{Style.RESET_ALL}")
-    benchmark_game(random_move, lambda game: mcts_move(game, MCTS_SIMULATIONS))
-
-    print(f"{Fore.BLUE}MCTS vs MCTS:{Style.RESET_ALL}")
-    benchmark_game(lambda game: mcts_move(game, MCTS_SIMULATIONS), lambda game: mcts_move(game, MCTS_SIMULATIONS))
-
-    print(f"{Fore.BLUE}BLACK Minimax vs WHITE MCTS:{Style.RESET_ALL}")
-    benchmark_game(lambda game: minimax_move(game, MINIMAX_DEPTH), lambda game: mcts_move(game, MCTS_SIMULATIONS))
-
-    print(f"{Fore.BLUE}WHITE Minimax vs BLACK MCTS:{Style.RESET_ALL}")
-    benchmark_game(lambda game: mcts_move(game, MCTS_SIMULATIONS), lambda game: minimax_move(game, MINIMAX_DEPTH))
-
-    print(f"{Fore.MAGENTA}Total time elapsed: {time.time() - start_time:.2f}{Style.RESET_ALL}")
-
-
-def benchmark_game(BLACK_AI: Callable[[Othello], tuple[int, int]], WHITE_AI: Callable[[Othello], tuple[int, int]]) -> None:
-    black_wins = 0
-    white_wins = 0
-    draws = 0
-    start_time = time.time()
-    for i in range(GAMES_COUNT):
-        current_time = time.time() - start_time
-        print(f"  game: {i + 1}/{GAMES_COUNT}  elapsed time: {current_time:.2f}s", end="\r")
-
-        game = Othello()
-        while game.state == State.BLACK_TURN or game.state == State.WHITE_TURN:
-            try:
-                move = BLACK_AI(game) if game.state == State.BLACK_TURN else WHITE_AI(game)
-                game.make_move(move)
-            except IndexError as e:
-                print(e)
-
-        if game.state == State.BLACK_WON:
-            black_wins += 1
-        elif game.state == State.WHITE_WON:
-            white_wins += 1
-        else:
-            draws += 1
-
-    print(f"  elapsed time: {time.time() - start_time:.2f}s                     ")
-    print(f"    BLACK wins: {black_wins} {black_wins / GAMES_COUNT * 100:.0f}%")
-    print(f"    WHITE wins: {white_wins} {white_wins / GAMES_COUNT * 100:.0f}%")
-    print(f"         draws: {draws} {draws / GAMES_COUNT * 100:.0f}%\n")
+# the games of the pure Python backend, run_benchmark.py --backend python plays them
+
+# final state, latency of every AI move, then the nodes and seconds of the [BLACK, WHITE] AIs of a played game
+GameResult = tuple[State, list[float], list[int], list[float]]
+
+# final states of the games won by BLACK and by WHITE, for run_benchmark.py
+BLACK_WON = State.BLACK_WON
+WHITE_WON = State.WHITE_WON
+
+
+def warm_up() -> None:
+    """Nothing to compile in the pure Python backend, run_benchmark.py calls it in every worker."""
+
+
+def benchmark_game(task: tuple[str, str, int, int, int, str, str | None, str | None]) -> GameResult:
+    """Plays one seeded game and returns its result.
+
+    The nodes and seconds are counted per player, so the nodes of different engines never add up.
+    """
+    black, white, depth, iterations, _, seed, book_path, cache_path = task
+    random.seed(seed)
+    book = None if book_path is None else OpeningBook(book_path)
+    cache = None if cache_path is None else EndgameCache(cache_path, cache_path + ".journal")
+    BLACK_AI = _player(black, depth, iterations, book, cache)
+    WHITE_AI = _player(white, depth, iterations, book, cache)
+    latencies = []
+    nodes = [0, 0]
+    seconds = [0.0, 0.0]
+
+    game = Othello()
+    while game.state == State.BLACK_TURN or game.state == State.WHITE_TURN:
+        black_turn = game.state == State.BLACK_TURN
+        try:
+            start_time = time.perf_counter()
+            move, move_nodes = BLACK_AI(game) if black_turn else WHITE_AI(game)
+            latency = time.perf_counter() - start_time
+            game.make_move(move)
+        except IndexError as e:
+            print(e)
+            continue
+        if (black if black_turn else white) != "random":
+            latencies.append(latency)
+            if move_nodes is not None:  # the endgame solver counts no nodes, so its time is left out too
+                nodes[not black_turn] += move_nodes
+                seconds[not black_turn] += latency
+    if book is not None:
+        book.close()
+    if cache is not None:
+        cache.close()
+    return game.state, latencies, nodes, seconds
+
+
+def _player(
+    name: str, depth: int, iterations: int, book: OpeningBook | None, cache: EndgameCache | None
+) -> Callable[[Othello], tuple[tuple[int, int], int | None]]:
+    """Returns the move function of a player, which returns the move and the nodes searched for it, None if solved."""
+    if name == "minimax":
+        table = TranspositionTable()  # one per game, so results don't depend on the games a worker played before
+
+        def play(game: Othello) -> tuple[tuple[int, int], int | None]:
+            stats = SearchStats()
+            return (
+                minimax_move(game, depth, table, stats=stats, book=book, endgame_cache=cache),
+                None if stats.endgame else stats.nodes,
+            )
+
+        return play
+    if name == "mcts":
+        player = MCTSPlayer(iterations, book)
+
+        def play(game: Othello) -> tuple[tuple[int, int], int]:
+            stats = MCTSStats()
+            return player.move(game, stats), stats.iterations
+
+        return play
+    return lambda game: (random_move(game), 0)
 
 
 def random_move(game: Othello) -> tuple[int, int]:
@@ -82,4 +95,9 @@ def random_move(game: Othello) -> tuple[int, int]:
 
 
 if __name__ == "__main__":
-    run_benchmarks()
+    # python benchmark.py [options] runs run_benchmark.py with the pure Python backend
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    import run_benchmark
+
+    sys.argv[1:1] = ["--backend", "python"]
+    run_benchmark.main()
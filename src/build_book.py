@@ -0,0 +1,65 @@
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from core.othello import Othello, State
+from core.minimax import search
+from core.transposition import TranspositionTable
+from core.book import add_move, write_book
+
+BOOK_GAMES = 200
+BOOK_PLIES = 12
+BOOK_DEPTH = 5
+
+
+def build_book(games: int, plies: int, depth: int, seed: int, workers: int) -> dict[int, tuple[int, int]]:
+    """Searches the opening positions of self-play games and returns their best moves keyed by canonical hash."""
+    tasks = [(plies, depth, f"{seed}:{i}", State.BLACK_TURN if i % 2 == 0 else State.WHITE_TURN) for i in range(games)]
+    moves: dict[int, tuple[int, int]] = {}
+    with multiprocessing.Pool(workers) as pool:
+        for game_moves in pool.map(book_game, tasks):
+            moves.update(game_moves)
+    return moves
+
+
+def book_game(task: tuple[int, int, str, State]) -> dict[int, tuple[int, int]]:
+    """Plays the first plies of one seeded game and returns the searched best move of every position.
+
+    The book side plays the best moves and the other side random ones, which covers the
+    positions a game following the book can reach against any opponent.
+    """
+    plies, depth, seed, book_side = task
+    random.seed(seed)
+    table = TranspositionTable()
+    moves = {}
+
+    game = Othello()
+    while len(game.history) < plies and game.state in (State.BLACK_TURN, State.WHITE_TURN):
+        _, move = search(game, depth, table)
+        add_move(moves, game, move)
+        if game.state != book_side:
+            valid_moves = game.get_valid_moves()
+            move = valid_moves[random.randint(0, len(valid_moves) - 1)]
+        game.make_move(move)
+    return moves
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build an opening book by searching the openings of self-play games.")
+    parser.add_argument("output", help="book file to write")
+    parser.add_argument("--games", type=int, default=BOOK_GAMES, help="self-play games")
+    parser.add_argument("--plies", type=int, default=BOOK_PLIES, help="plies of each game stored in the book")
+    parser.add_argument("--depth", type=int, default=BOOK_DEPTH, help="search depth of the book moves")
+    parser.add_argument("--seed", type=int, default=0, help="seed the games are derived from")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    moves = build_book(args.games, args.plies, args.depth, args.seed, args.workers)
+    write_book(args.output, moves)
+    print(f"{len(moves)} positions written to {args.output} in {time.time() - start_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
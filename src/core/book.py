@@ -0,0 +1,70 @@
+import mmap
+import struct
+from .othello import Othello
+from .symmetry import canonical_hash, inverse_move, transform_move
+
+# file layout, all little-endian: MAGIC, the entry count as u64, the sorted u64 Zobrist keys of
+# canonical positions, then one byte per key with the index y * 8 + x of the move to play in the
+# canonical orientation
+MAGIC = b"OTHBOOK2"
+HEADER = struct.Struct("<8sQ")
+KEY = struct.Struct("<Q")
+
+
+class OpeningBook:
+    """Read-only opening book file, memory-mapped and searched by the canonical Zobrist hash of a position."""
+
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            self.map.close()
+            raise ValueError(f"Invalid opening book: {path}")
+        magic, self.size = HEADER.unpack_from(self.map)
+        if magic != MAGIC or len(self.map) != HEADER.size + self.size * (KEY.size + 1):
+            self.map.close()
+            raise ValueError(f"Invalid opening book: {path}")
+
+    def move(self, game: Othello) -> tuple[int, int] | None:
+        """Returns the book move (x, y) of the game position, or None if it isn't in the book."""
+        key, symmetry = canonical_hash(game)
+        move = self.lookup(key)
+        return None if move is None else inverse_move(move, symmetry)
+
+    def lookup(self, key: int) -> tuple[int, int] | None:
+        """Returns the book move (x, y) stored for the canonical hash, or None if it isn't in the book."""
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.map, HEADER.size + middle * KEY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.size or KEY.unpack_from(self.map, HEADER.size + low * KEY.size)[0] != key:
+            return None
+        index = self.map[HEADER.size + self.size * KEY.size + low]
+        return index & 7, index >> 3
+
+    def close(self) -> None:
+        self.map.close()
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def add_move(moves: dict[int, tuple[int, int]], game: Othello, move: tuple[int, int]) -> None:
+    """Adds the move (x, y) of the game position to the book moves, keyed by canonical hash."""
+    key, symmetry = canonical_hash(game)
+    moves[key] = transform_move(move, symmetry)
+
+
+def write_book(path: str, moves: dict[int, tuple[int, int]]) -> None:
+    """Writes the book moves (x, y) keyed by canonical hash to a book file."""
+    keys = sorted(moves)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(keys)))
+        file.write(b"".join(KEY.pack(key) for key in keys))
+        file.write(bytes(moves[key][1] * 8 + moves[key][0] for key in keys))
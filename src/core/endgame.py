@@ -0,0 +1,148 @@
+from .othello import Othello, State, FULL, valid_cells, flipped_cells
+
+# minimax_move hands the game to the solver once this few cells are empty
+ENDGAME_EMPTIES = 11
+
+# below this many empty cells moves are ordered by parity only, counting replies costs more than it saves
+_FASTEST_FIRST_EMPTIES = 7
+
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+
+
+def solve_endgame(game: Othello, exact: bool = True) -> tuple[int, tuple[int, int]]:
+    """Returns the final disc difference for the current player with the best move, only its sign if not `exact`."""
+    if game.state not in (State.BLACK_TURN, State.WHITE_TURN):
+        raise ValueError("Can't solve endgame: Game is over")
+    if game.state == State.BLACK_TURN:
+        player, opponent = game.black, game.white
+    else:
+        player, opponent = game.white, game.black
+
+    alpha, beta = (-64, 64) if exact else (-1, 1)
+    best_value = -65
+    best_move = (-1, -1)
+    for placed, new_player, new_opponent in _ordered_children(player, opponent, game.valid):
+        value = -_solve(new_opponent, new_player, -beta, -alpha, False)
+        if value > best_value:
+            best_value = value
+            best_move = ((placed.bit_length() - 1) & 7, (placed.bit_length() - 1) >> 3)
+            alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+
+    if not exact:
+        best_value = (best_value > 0) - (best_value < 0)
+    return best_value, best_move
+
+
+def _solve(player: int, opponent: int, alpha: int, beta: int, passed: bool) -> int:
+    """Negamax over the final disc difference for the player to move."""
+    empty = ~(player | opponent) & FULL
+    empty_cells = empty.bit_count()
+    if empty_cells == 0:
+        return player.bit_count() - opponent.bit_count()
+    if empty_cells <= 4:
+        return _solve_few(player, opponent, empty, alpha, beta, passed)
+
+    moves = valid_cells(player, opponent)
+    if not moves:
+        if passed:
+            return player.bit_count() - opponent.bit_count()
+        return -_solve(opponent, player, -beta, -alpha, True)
+
+    best_value = -65
+    if empty_cells < _FASTEST_FIRST_EMPTIES:
+        children = _parity_children(player, opponent, moves, empty)
+    else:
+        children = _ordered_children(player, opponent, moves)
+    for _, new_player, new_opponent in children:
+        value = -_solve(new_opponent, new_player, -beta, -alpha, False)
+        if value > best_value:
+            best_value = value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+    return best_value
+
+
+def _solve_few(player: int, opponent: int, empty: int, alpha: int, beta: int, passed: bool) -> int:
+    """Solves positions with at most 4 empty cells by trying each empty cell directly, odd regions first."""
+    if empty & (empty - 1) == 0:
+        return _solve_last(player, opponent, empty)
+
+    best_value = -65
+    moved = False
+    for placed in _parity_cells(empty):
+        flipped = flipped_cells(placed, player, opponent)
+        if not flipped:
+            continue
+        moved = True
+        value = -_solve_few(opponent ^ flipped, player | placed | flipped, empty ^ placed, -beta, -alpha, False)
+        if value > best_value:
+            best_value = value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+    if moved:
+        return best_value
+    if passed:
+        return player.bit_count() - opponent.bit_count()
+    return -_solve_few(opponent, player, empty, -beta, -alpha, True)
+
+
+def _solve_last(player: int, opponent: int, placed: int) -> int:
+    """Returns the final disc difference with one empty cell left."""
+    flipped = flipped_cells(placed, player, opponent)
+    if flipped:
+        return (player | placed | flipped).bit_count() - (opponent ^ flipped).bit_count()
+    flipped = flipped_cells(placed, opponent, player)
+    if flipped:
+        return (player ^ flipped).bit_count() - (opponent | placed | flipped).bit_count()
+    return player.bit_count() - opponent.bit_count()  # neither player can fill the last cell
+
+
+def _ordered_children(player: int, opponent: int, moves: int) -> list[tuple[int, int, int]]:
+    """Returns (placed, player, opponent) after each move, the moves leaving the opponent fewest replies first."""
+    empty = ~(player | opponent) & FULL
+    odd = _odd_quadrants(empty)
+    children = []
+    while moves:
+        placed = moves & -moves
+        moves ^= placed
+        flipped = flipped_cells(placed, player, opponent)
+        new_player, new_opponent = player | placed | flipped, opponent ^ flipped
+        replies = valid_cells(new_opponent, new_player).bit_count()
+        children.append((replies, not placed & odd, placed, new_player, new_opponent))
+    children.sort(key=lambda child: (child[0], child[1]))
+    return [child[2:] for child in children]
+
+
+def _parity_children(player: int, opponent: int, moves: int, empty: int) -> list[tuple[int, int, int]]:
+    """Returns (placed, player, opponent) after each move, the moves in odd regions first."""
+    children = []
+    for placed in _parity_cells(empty):
+        if placed & moves:
+            flipped = flipped_cells(placed, player, opponent)
+            children.append((placed, player | placed | flipped, opponent ^ flipped))
+    return children
+
+
+def _parity_cells(empty: int) -> list[int]:
+    """Returns the empty cells one by one, the ones in quadrants with an odd number of empty cells first."""
+    odd = _odd_quadrants(empty)
+    result = []
+    for cells in (empty & odd, empty & ~odd):
+        while cells:
+            placed = cells & -cells
+            cells ^= placed
+            result.append(placed)
+    return result
+
+
+def _odd_quadrants(empty: int) -> int:
+    """Returns the mask of the quadrants that have an odd number of empty cells."""
+    odd = 0
+    for quadrant in QUADRANTS:
+        if (empty & quadrant).bit_count() & 1:
+            odd |= quadrant
+    return odd
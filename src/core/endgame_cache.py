@@ -0,0 +1,124 @@
+import mmap
+import os
+import struct
+
+# file layout, all little-endian: MAGIC and the slot count as u64, then the slots of an open addressing
+# hash table with linear probing, each the Zobrist key of the canonical position as u64 (0 for an empty
+# slot), the exact final disc difference for the player to move as i8 and the index y * 8 + x of the
+# best move in the canonical orientation as u8
+MAGIC = b"OTHEGC02"
+HEADER = struct.Struct("<8sQ")
+SLOT = struct.Struct("<QbB")
+
+# the merger sizes the table to keep it at most half full
+MIN_SLOTS = 1 << 10
+
+
+class EndgameCache:
+    """Solved endgame positions in a memory-mapped hash table file, new solutions go to the `journal` file."""
+
+    def __init__(self, path: str, journal: str | None = None) -> None:
+        self.path = path
+        self.journal = journal
+        self.map: mmap.mmap | None = None
+        self.slots = 0
+        self.reload()
+
+    def reload(self) -> None:
+        """Maps the current table file, which a merge may have replaced since it was opened."""
+        self.close()
+        try:
+            file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with file:
+            table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, slots = HEADER.unpack_from(table) if len(table) >= HEADER.size else (None, 0)
+        if magic != MAGIC or not slots or slots & (slots - 1) or len(table) != HEADER.size + slots * SLOT.size:
+            table.close()
+            raise ValueError(f"Invalid endgame cache: {self.path}")
+        self.map = table
+        self.slots = slots
+
+    def lookup(self, key: int) -> tuple[int, tuple[int, int]] | None:
+        """Returns the final score and best move (x, y) of the position with the given hash, or None."""
+        if self.map is None:
+            return None
+        mask = self.slots - 1
+        slot = key & mask
+        for _ in range(self.slots):  # a table without empty slots, which the merger never writes, is a miss
+            slot_key, score, index = SLOT.unpack_from(self.map, HEADER.size + slot * SLOT.size)
+            if slot_key == key:
+                return score, (index & 7, index >> 3)
+            if slot_key == 0:
+                return None
+            slot = (slot + 1) & mask
+        return None
+
+    def record(self, key: int, score: int, move: tuple[int, int]) -> None:
+        """Appends a solved position to the journal, a later merge adds it to the table."""
+        if self.journal is not None:
+            # one write per record so concurrent writers append whole records
+            with open(self.journal, "ab") as file:
+                file.write(SLOT.pack(key, score, move[1] * 8 + move[0]))
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+            self.slots = 0
+
+    def __enter__(self) -> "EndgameCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def merge_cache(path: str, journals: list[str]) -> int:
+    """Adds the journal files to the table file, replaced in one step, and returns the number of positions in it."""
+    entries: dict[int, tuple[int, int]] = {}
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+        for offset in range(HEADER.size, len(data), SLOT.size):
+            key, score, index = SLOT.unpack_from(data, offset)
+            if key != 0:
+                entries[key] = (score, index)
+    except FileNotFoundError:
+        pass
+
+    merged = []
+    for journal in journals:
+        merging = journal + ".merging"
+        try:
+            os.replace(journal, merging)
+        except FileNotFoundError:
+            continue
+        with open(merging, "rb") as file:
+            data = file.read()
+        for offset in range(0, len(data) - len(data) % SLOT.size, SLOT.size):
+            key, score, index = SLOT.unpack_from(data, offset)
+            if key != 0:
+                entries[key] = (score, index)
+        merged.append(merging)
+
+    slots = MIN_SLOTS
+    while slots < 2 * len(entries):
+        slots *= 2
+    table = bytearray(HEADER.size + slots * SLOT.size)
+    HEADER.pack_into(table, 0, MAGIC, slots)
+    mask = slots - 1
+    for key, (score, index) in entries.items():
+        slot = key & mask
+        while SLOT.unpack_from(table, HEADER.size + slot * SLOT.size)[0] != 0:
+            slot = (slot + 1) & mask
+        SLOT.pack_into(table, HEADER.size + slot * SLOT.size, key, score, index)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(table)
+    os.replace(temporary, path)
+    for merging in merged:
+        os.remove(merging)
+    return len(entries)
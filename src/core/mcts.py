@@ -1,25 +1,171 @@
 from __future__ import annotations
 import random
-import copy
 import math
+import multiprocessing
+import heapq
+import os
+import sys
+import time
 from .othello import Othello, State
+from .book import OpeningBook
 
+# with more nodes than the budget, a search prunes this fraction of it at once
+PRUNE_SHARE = 8
 
-def mcts_move(game: Othello, iterations: int) -> tuple[int, int]:
+# moves shared by all nodes instead of a tuple per unexplored move, indexed by y * 8 + x
+MOVES = [(index & 7, index >> 3) for index in range(64)]
+
+
+def mcts_move(
+    game: Othello,
+    iterations: int,
+    stats: MCTSStats | None = None,
+    book: OpeningBook | None = None,
+    time_limit: float | None = None,
+    max_nodes: int | None = None,
+) -> tuple[int, int]:
     """Returns the best move for the current turn using Monte Carlo Tree Search."""
+    book_move = _book_move(game, book)
+    if book_move is not None:
+        return book_move
+    root = Node(None, (-1, -1), game.state, game.get_valid_moves())
+    _search(root, game, iterations, stats, time_limit, early_stop=True, max_nodes=max_nodes)
+    return root.get_most_visited().move
+
+
+class MCTSPlayer:
+    """Plays Monte Carlo Tree Search moves and keeps the tree between the moves of a game."""
+
+    def __init__(
+        self,
+        iterations: int,
+        book: OpeningBook | None = None,
+        time_limit: float | None = None,
+        max_nodes: int | None = None,
+    ) -> None:
+        self.iterations = iterations
+        self.book = book
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.root: Node | None = None
+        self.history: list = []  # game history at the root
+        self.hash = 0  # Zobrist hash of the position at the root
+
+    def move(self, game: Othello, stats: MCTSStats | None = None) -> tuple[int, int]:
+        """Returns the best move for the current turn, from the book or searching from the reused tree."""
+        book_move = _book_move(game, self.book)
+        if book_move is not None:
+            return book_move  # the tree catches up with the book moves on the next search
+        self._advance(game)
+        _search(self.root, game, self.iterations, stats, self.time_limit, early_stop=True, max_nodes=self.max_nodes)
+        return self.root.get_most_visited().move
+
+    def _advance(self, game: Othello) -> None:
+        root = self.root
+        known = len(self.history)
+        # history entries keep the hash before their move, a game set up with from_position has none
+        known_hash = game.history[known][4] if known < len(game.history) else game.hash
+        if root is not None and game.history[:known] == self.history and known_hash == self.hash:
+            for placed, *_ in game.history[known:]:
+                index = placed.bit_length() - 1
+                move = (index & 7, index >> 3)
+                root = next((child for child in root.children if child.move == move), None)
+                if root is None:
+                    break  # the move was never explored
+        else:
+            root = None  # a different game
+
+        if root is None:
+            root = Node(None, (-1, -1), game.state, game.get_valid_moves())
+        root.parent = None  # release the old root and the siblings of the new one
+        self.root = root
+        self.history = game.history.copy()
+        self.hash = game.hash
+
+
+class ParallelMCTS:
+    """Root-parallel Monte Carlo Tree Search over a persistent pool of worker processes."""
+
+    def __init__(self, iterations: int, workers: int | None = None, seed: int | None = None) -> None:
+        self.iterations = iterations
+        self.workers = workers or os.cpu_count() or 1
+        self.random = random.Random(seed)
+        # fresh worker processes, forking a parent that ran threads can deadlock the children
+        self.pool = multiprocessing.get_context("spawn").Pool(self.workers)
+
+    def move(self, game: Othello) -> tuple[int, int]:
+        """Returns the most visited move over the trees of all workers."""
+        tasks = [(game, self.iterations, self.random.getrandbits(32)) for _ in range(self.workers)]
+        totals: dict[tuple[int, int], list[int]] = {}
+        for statistics in self.pool.map(_root_statistics, tasks):
+            for move, visits, wins in statistics:
+                total = totals.setdefault(move, [0, 0])
+                total[0] += visits
+                total[1] += wins
+        return max(totals, key=lambda move: totals[move][0])
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self) -> ParallelMCTS:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _root_statistics(task: tuple[Othello, int, int]) -> list[tuple[tuple[int, int], int, int]]:
+    """Worker task of ParallelMCTS, returns (move, visits, wins) of every root child."""
+    game, iterations, seed = task
+    random.seed(seed)
     root = Node(None, (-1, -1), game.state, game.get_valid_moves())
+    _search(root, game, iterations)
+    return [(child.move, child.visits, child.wins) for child in root.children]
+
 
-    for _ in range(iterations):
+def _book_move(game: Othello, book: OpeningBook | None) -> tuple[int, int] | None:
+    """Returns the book move of the game position if it is a valid move, None otherwise."""
+    if book is None:
+        return None
+    move = book.move(game)
+    return move if move in game.get_valid_moves() else None
+
+
+def _search(
+    root: Node,
+    game: Othello,
+    iterations: int,
+    stats: MCTSStats | None = None,
+    time_limit: float | None = None,
+    early_stop: bool = False,
+    max_nodes: int | None = None,
+) -> None:
+    """Runs the MCTS iterations from the root, which is the current position of the game."""
+    simulation = game.copy()  # every iteration plays on this game and undoes its moves afterwards
+    root_moves = len(simulation.history)
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    if max_nodes is not None and max_nodes < 1:
+        raise ValueError(f"MCTS node budget must be positive: {max_nodes}")
+    nodes = root.size() if max_nodes is not None else 0
+    if stats is not None:
+        search_start = phase_start = time.perf_counter()
+
+    completed = 0
+    for completed in range(1, iterations + 1):
+        if max_nodes is not None and nodes >= max_nodes:
+            nodes -= _prune(root, max(1, max_nodes // PRUNE_SHARE))
         node = root
-        simulation = copy.deepcopy(game)
 
         # SELECT promising child node while current node is fully expanded and non-terminal
         while node.unexplored == [] and node.children != []:
             node = node.select_child()
             simulation.make_move(node.move)
+        if stats is not None:
+            phase_start = stats.lap("select", phase_start)
 
-        # EXPAND one random unexplored move
-        if node.unexplored != []:
+        # EXPAND one random unexplored move while the tree is within its node budget
+        if node.unexplored != [] and (max_nodes is None or nodes < max_nodes or node is root):
             explored_move = node.unexplored[random.randint(0, len(node.unexplored) - 1)]
             explored_turn = simulation.state
             simulation.make_move(explored_move)
@@ -28,12 +174,18 @@ def mcts_move(game: Othello, iterations: int) -> tuple[int, int]:
             child = Node(node, explored_move, explored_turn, simulation.get_valid_moves())
             node.children.append(child)
             node = child
+            nodes += 1
+        if stats is not None:
+            stats.max_depth = max(stats.max_depth, len(simulation.history) - root_moves)
+            phase_start = stats.lap("expand", phase_start)
 
         # SIMULATE while game is not over, make a random move
         while simulation.state in (State.BLACK_TURN, State.WHITE_TURN):
             moves = simulation.get_valid_moves()
             explored_move = moves[random.randint(0, len(moves) - 1)]
             simulation.make_move(explored_move)
+        if stats is not None:
+            phase_start = stats.lap("simulate", phase_start)
 
         # BACKPROPAGATE simulation result
         winner = simulation.state
@@ -47,16 +199,94 @@ def mcts_move(game: Othello, iterations: int) -> tuple[int, int]:
                 node.wins -= 1
             node = node.parent
 
-    return root.get_most_visited().move
+        while len(simulation.history) > root_moves:
+            simulation.undo_move()
+        if stats is not None:
+            phase_start = stats.lap("backpropagate", phase_start)
+
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        if early_stop and _visit_lead(root) > iterations - completed:
+            break
+
+    if stats is not None:
+        stats.iterations += completed
+        stats.tree_size = root.size()
+        stats.tree_bytes = root.memory()
+        stats.root_visits = {child.move: child.visits for child in root.children}
+        stats.elapsed = time.perf_counter() - search_start
+
+
+def _visit_lead(root: Node) -> int:
+    """Returns how many more visits the most visited child of the root has than any other move."""
+    first = second = 0  # moves without a child have no visits
+    for child in root.children:
+        if child.visits > first:
+            first, second = child.visits, first
+        elif child.visits > second:
+            second = child.visits
+    return first - second
+
+
+def _prune(root: Node, count: int) -> int:
+    """Removes up to `count` of the least visited leaves below the root's children, returns how many were removed."""
+    leaves = []
+    stack = [grandchild for child in root.children for grandchild in child.children]
+    while stack:
+        node = stack.pop()
+        if node.children:
+            stack.extend(node.children)
+        else:
+            leaves.append(node)
+    pruned = heapq.nsmallest(count, leaves, key=lambda leaf: leaf.visits)
+    for leaf in pruned:
+        leaf.parent.children.remove(leaf)
+        leaf.parent.unexplored.append(leaf.move)
+        leaf.parent = None
+    return len(pruned)
+
+
+class MCTSStats:
+    """Counters of a Monte Carlo Tree Search, filled in when passed to `mcts_move` or `MCTSPlayer.move`."""
+
+    def __init__(self) -> None:
+        self.iterations = 0
+        self.tree_size = 0  # nodes in the tree after the search, including the ones reused from earlier moves
+        self.max_depth = 0  # deepest node selected or expanded, in moves below the root
+        self.tree_bytes = 0  # memory held by the nodes of the tree after the search
+        self.phase_times = {"select": 0.0, "expand": 0.0, "simulate": 0.0, "backpropagate": 0.0}  # seconds
+        self.root_visits: dict[tuple[int, int], int] = {}  # visits of every move at the root
+        self.elapsed = 0.0  # seconds spent in the latest search
+
+    def lap(self, phase: str, start: float) -> float:
+        """Adds the time since `start` to the phase and returns the current time."""
+        now = time.perf_counter()
+        self.phase_times[phase] += now - start
+        return now
+
+    @property
+    def bytes_per_node(self) -> float:
+        """Average memory of a node of the tree, with its lists of children and unexplored moves."""
+        return self.tree_bytes / self.tree_size if self.tree_size else 0.0
+
+    def as_dict(self) -> dict:
+        """Returns the fields with the root visits as [x, y, visits] lists and the bytes per node."""
+        return {
+            **vars(self),
+            "root_visits": [[*move, visits] for move, visits in self.root_visits.items()],
+            "bytes_per_node": self.bytes_per_node,
+        }
 
 
 class Node:
-    """Node of the MCTS tree."""
+    """Node of the MCTS tree, with slots and the shared move tuples of MOVES to save memory."""
+
+    __slots__ = ("move", "turn", "unexplored", "parent", "children", "visits", "wins")
 
     def __init__(self, parent: Node | None, move: tuple[int, int], turn: State, unexplored: list[tuple[int, int]]):
         self.move = move
         self.turn = turn
-        self.unexplored = unexplored
+        self.unexplored = [MOVES[y * 8 + x] for x, y in unexplored]
         self.parent = parent
         self.children: list[Node] = []
         self.visits = 0
@@ -76,3 +306,23 @@ class Node:
 
     def get_most_visited(self) -> Node:  # best move
         return max(self.children, key=lambda child: child.visits)
+
+    def size(self) -> int:
+        """Returns the number of nodes in the subtree of this node, including itself."""
+        size = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            size += 1
+            stack.extend(node.children)
+        return size
+
+    def memory(self) -> int:
+        """Returns the bytes held by the nodes of the subtree of this node and their lists."""
+        memory = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            memory += sys.getsizeof(node) + sys.getsizeof(node.children) + sys.getsizeof(node.unexplored)
+            stack.extend(node.children)
+        return memory
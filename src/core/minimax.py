@@ -1,44 +1,172 @@
-import copy
+from __future__ import annotations
 import random
 import sys
-from .othello import Othello, Cell, State
+import time
+from typing import Sequence
+from .othello import Othello, State, FULL, REWARDS, can_move, positional_score, square
+from .transposition import TranspositionTable, Bound
+from .book import OpeningBook
+from .endgame_cache import EndgameCache
+from .symmetry import canonical_hash, inverse_move, transform_move
+from .endgame import solve_endgame, ENDGAME_EMPTIES
 
 
-def minimax_move(game: Othello, depth: int) -> tuple[int, int]:
+class _SearchTimeout(Exception):
+    """Raised inside the search when the time limit of an iterative deepening search runs out."""
+
+
+def minimax_move(
+    game: Othello,
+    depth: int = 1,
+    table: TranspositionTable | None = None,
+    time_limit: float | None = None,
+    ordering: MoveOrdering | None = None,
+    stats: SearchStats | None = None,
+    book: OpeningBook | None = None,
+    endgame_cache: EndgameCache | None = None,
+) -> tuple[int, int]:
     """Use minimax algorithm to find a good move for the current player."""
+    start_time = time.perf_counter()
     moves = game.get_valid_moves()
+    round_idx = game.black_score + game.white_score - 3  # round 1 starts with the 4 initial discs
+    empty_cells = 64 - game.black_score - game.white_score
+    table = TranspositionTable() if table is None else table
+    ordering = MoveOrdering() if ordering is None else ordering
+    endgame = False
+    score = None
+    book_move = None if book is None else book.move(game)
     if len(moves) == 1:  # only one move available
-        return moves[0]
+        move, depth = moves[0], 0
+    elif book_move in moves:  # also rules out a hash collision with a position of other moves
+        move, depth = book_move, 0
+    elif round_idx < 3:  # random first move
+        move, depth = moves[random.randint(0, len(moves) - 1)], 0
+    elif empty_cells <= ENDGAME_EMPTIES:
+        score, move = _solve_cached(game, endgame_cache)  # few enough cells left to search to the end
+        depth = empty_cells
+        endgame = True
+    elif time_limit is not None:
+        move, depth = _iterative_deepening(game, time_limit, table, ordering, stats)
+    else:
+        # increase depth based on round, later rounds matter more
+        if round_idx > 40:
+            depth += 2
+        elif round_idx > 30:
+            depth += 1
+        move = _minimax(game, game.state, depth, -sys.maxsize, sys.maxsize, table, ordering, None, stats)[1]
+
+    if stats is not None:
+        stats.depth = depth
+        stats.endgame = endgame
+        stats.score = score
+        stats.elapsed = time.perf_counter() - start_time
+    return move
+
+
+def _solve_cached(game: Othello, endgame_cache: EndgameCache | None) -> tuple[int, tuple[int, int]]:
+    """Returns the final score and best move of the endgame from the cache, or solves it and records it in the cache."""
+    if endgame_cache is None:
+        return solve_endgame(game)
+    key, symmetry = canonical_hash(game)
+    cached = endgame_cache.lookup(key)
+    if cached is not None:
+        move = inverse_move(cached[1], symmetry)
+        if game.valid & square(*move):  # a hash collision could give an invalid move
+            return cached[0], move
+    score, move = solve_endgame(game)
+    endgame_cache.record(key, score, transform_move(move, symmetry))
+    return score, move
+
 
-    round_idx = _calculate_round(game.board)  # random first move
-    if round_idx < 3:
-        return moves[random.randint(0, len(moves) - 1)]
+def search(game: Othello, depth: int, table: TranspositionTable | None = None) -> tuple[int, tuple[int, int]]:
+    """Searches the game to the given depth and returns the value and the best move for the current player."""
+    table = TranspositionTable() if table is None else table
+    return _minimax(game, game.state, depth, -sys.maxsize, sys.maxsize, table, MoveOrdering())
 
-    # increase depth based on round, later rounds matter more
-    if round_idx >= 50:
-        depth += 10  # end game solver
-    elif round_idx > 40:
-        depth += 2
-    elif round_idx > 30:
-        depth += 1
 
-    return _minimax(game, game.state, depth, -sys.maxsize, sys.maxsize)[1]
+def _iterative_deepening(
+    game: Othello,
+    time_limit: float,
+    table: TranspositionTable,
+    ordering: MoveOrdering,
+    stats: SearchStats | None = None,
+) -> tuple[tuple[int, int], int]:
+    """Search one ply deeper at a time until the time limit runs out, return the best move and its depth."""
+    deadline = time.perf_counter() + time_limit
+    history_len = len(game.history)
+    empty_cells = 64 - game.black_score - game.white_score
+    best_move = (-1, -1)
+    completed = 0
+    for depth in range(1, empty_cells + 1):
+        try:
+            # the first depth always completes so there is a move to return
+            value, best_move = _minimax(
+                game,
+                game.state,
+                depth,
+                -sys.maxsize,
+                sys.maxsize,
+                table,
+                ordering,
+                None if depth == 1 else deadline,
+                stats,
+            )
+        except _SearchTimeout:
+            while len(game.history) > history_len:  # rewind the moves of the interrupted search
+                game.undo_move()
+            break
+        completed = depth
+        if abs(value) == sys.maxsize:
+            break  # the game is decided, deeper searches can't change the result
+    return best_move, completed
 
 
-def _minimax(game: Othello, my_turn: State, depth: int, alpha: int, beta: int) -> tuple[int, tuple[int, int]]:
+def _minimax(
+    game: Othello,
+    my_turn: State,
+    depth: int,
+    alpha: int,
+    beta: int,
+    table: TranspositionTable,
+    ordering: MoveOrdering,
+    deadline: float | None = None,
+    stats: SearchStats | None = None,
+) -> tuple[int, tuple[int, int]]:
     """Minimax tree search algorithm."""
+    if stats is not None:
+        stats.nodes += 1
     state = game.state
     if depth == 0 or state != State.BLACK_TURN and state != State.WHITE_TURN:
+        if stats is not None:
+            stats.leaves += 1
         return _evaluate_board(game, my_turn), (-1, -1)
+    if deadline is not None and time.perf_counter() > deadline:
+        raise _SearchTimeout
 
-    moves = game.get_valid_moves()
+    # values are relative to my_turn, so positions searched for white are keyed apart from black
+    key = game.hash if my_turn == State.BLACK_TURN else game.hash ^ FULL
+    entry = table.probe(key)
+    if entry is not None and entry[1] >= depth:
+        _, _, bound, value, move = entry
+        if bound == Bound.EXACT:
+            return value, move
+        elif bound == Bound.LOWER:
+            alpha = max(alpha, value)
+        else:
+            beta = min(beta, value)
+        if alpha >= beta:
+            return value, move
+    alpha_start, beta_start = alpha, beta
+
+    ply = len(game.history)
+    moves = ordering.order(game.get_valid_moves(), ply, None if entry is None else entry[4])
     best_move = moves[0]
     best_value = -sys.maxsize if state == my_turn else sys.maxsize
 
-    for move in moves:
-        simulation = copy.deepcopy(game)
-        simulation.make_move(move)
-        value = _minimax(simulation, my_turn, depth - 1, alpha, beta)[0]
+    for i, move in enumerate(moves):
+        game.make_move(move)
+        value = _minimax(game, my_turn, depth - 1, alpha, beta, table, ordering, deadline, stats)[0]
+        game.undo_move()
 
         if state == my_turn:
             if value > best_value:
@@ -51,21 +179,81 @@ def _minimax(game: Othello, my_turn: State, depth: int, alpha: int, beta: int) -
                 best_move = move
             beta = min(best_value, beta)
         if alpha >= beta:
+            ordering.record_cutoff(move, ply, depth, i == 0)
+            if stats is not None:
+                stats.cutoffs += 1
             break  # prune
 
+    if stats is not None:
+        stats.expanded += 1
+        stats.children += i + 1
+    if best_value <= alpha_start:
+        table.store(key, depth, Bound.UPPER, best_value, best_move)
+    elif best_value >= beta_start:
+        table.store(key, depth, Bound.LOWER, best_value, best_move)
+    else:
+        table.store(key, depth, Bound.EXACT, best_value, best_move)
     return best_value, best_move
 
 
-REWARDS = [
-    [80, -20, 20, 10, 10, 20, -20, 80],
-    [-20, -40, -10, -10, -10, -10, -40, -20],
-    [20, -10, 10, 0, 0, 10, -10, 20],
-    [10, -10, 0, 5, 5, 0, -10, 10],
-    [10, -10, 0, 5, 5, 0, -10, 10],
-    [20, -10, 10, 0, 0, 10, -10, 20],
-    [-20, -40, -10, -10, -10, -10, -40, -20],
-    [80, -20, 20, 10, 10, 20, -20, 80],
-]
+class SearchStats:
+    """Counters of a minimax search, filled in when passed to `minimax_move`."""
+
+    def __init__(self) -> None:
+        self.nodes = 0  # positions visited, including the ones answered by the transposition table
+        self.leaves = 0  # positions evaluated by the heuristic or as finished games
+        self.cutoffs = 0  # beta cutoffs
+        self.expanded = 0  # positions whose moves were searched
+        self.children = 0  # moves searched below the expanded positions
+        self.depth = 0  # depth of the latest completed search, 0 if the move needed no search
+        self.endgame = False  # whether the latest move came from the endgame solver
+        self.score = None  # final disc difference for the current player solved by the latest move, if any
+        self.elapsed = 0.0  # seconds spent in the latest minimax_move call
+
+    @property
+    def branching_factor(self) -> float:
+        """Average number of moves searched per expanded position."""
+        return self.children / self.expanded if self.expanded else 0.0
+
+    def as_dict(self) -> dict:
+        """Returns the fields with the branching factor."""
+        return {**vars(self), "branching_factor": self.branching_factor}
+
+
+class MoveOrdering:
+    """Killer moves and history scores collected during a search, used to try the most promising moves first."""
+
+    def __init__(self) -> None:
+        self.killers: list[list[tuple[int, int]]] = [[] for _ in range(64)]  # two latest cutoff moves for each ply
+        self.history = [[0 for _ in range(8)] for _ in range(8)]  # indexed by [y][x]
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def order(self, moves: list[tuple[int, int]], ply: int, hash_move: tuple[int, int] | None) -> list[tuple[int, int]]:
+        """Returns the moves sorted from the most to the least promising."""
+        killers = self.killers[ply]
+        history = self.history
+        return sorted(
+            moves,
+            key=lambda move: (move == hash_move, move in killers, history[move[1]][move[0]], REWARDS[move[1]][move[0]]),
+            reverse=True,
+        )
+
+    def record_cutoff(self, move: tuple[int, int], ply: int, depth: int, first: bool) -> None:
+        """Remembers a move that caused a beta cutoff."""
+        self.cutoffs += 1
+        if first:
+            self.first_move_cutoffs += 1
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move[1]][move[0]] += depth * depth
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Share of cutoffs caused by the first move searched, 1.0 means perfect ordering."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
 
 
 def _evaluate_board(game: Othello, my_turn: State) -> int:
@@ -78,21 +266,21 @@ def _evaluate_board(game: Othello, my_turn: State) -> int:
     elif state == State.DRAW:
         return 0
 
-    reward = 0
-    for y in range(8):
-        for x in range(8):
-            if game.board[y][x] == Cell.BLACK:
-                reward += REWARDS[y][x] if my_turn == State.BLACK_TURN else -REWARDS[y][x]
-            elif game.board[y][x] == Cell.WHITE:
-                reward += REWARDS[y][x] if my_turn == State.WHITE_TURN else -REWARDS[y][x]
-    return reward
-
-
-def _calculate_round(board: list[list[Cell]]) -> int:
-    """Calculate the current round based on the number of pieces on the board."""
-    count = -3
-    for y in range(8):
-        for x in range(8):
-            if board[y][x] in (Cell.BLACK, Cell.WHITE):
-                count += 1
-    return count
+    # the game keeps the REWARDS sums of both colors up to date on every move
+    if my_turn == State.BLACK_TURN:
+        return game.black_positional - game.white_positional
+    return game.white_positional - game.black_positional
+
+
+def evaluate_batch(positions: Sequence[tuple[int, int]], my_turns: Sequence[State]) -> list[int]:
+    """Use the heuristic of the search to evaluate many (black, white) bitboard positions at once."""
+    rewards = []
+    for (black, white), my_turn in zip(positions, my_turns):
+        if can_move(black, white) or can_move(white, black):
+            reward = positional_score(black) - positional_score(white)
+        else:
+            difference = black.bit_count() - white.bit_count()
+            reward = sys.maxsize if difference > 0 else -sys.maxsize if difference < 0 else 0
+        rewards.append(reward if my_turn == State.BLACK_TURN else -reward)
+    return rewards
+
@@ -1,3 +1,4 @@
+import random
 from enum import Enum
 
 
@@ -16,6 +17,48 @@ class State(Enum):
     DRAW = 5
 
 
+# bit i of a bitboard is the cell (x, y) with i = y * 8 + x
+FULL = 0xFFFFFFFFFFFFFFFF
+NOT_A_FILE = 0xFEFEFEFEFEFEFEFE  # every cell except x == 0
+NOT_H_FILE = 0x7F7F7F7F7F7F7F7F  # every cell except x == 7
+INNER_FILES = NOT_A_FILE & NOT_H_FILE
+
+# (shift, mask) for each direction, positive shifts go left, negative go right
+# the mask removes cells that wrapped around to the opposite edge of the board
+DIRECTIONS = (
+    (1, NOT_A_FILE),
+    (-1, NOT_H_FILE),
+    (8, FULL),
+    (-8, FULL),
+    (9, NOT_A_FILE),
+    (-9, NOT_H_FILE),
+    (7, NOT_H_FILE),
+    (-7, NOT_A_FILE),
+)
+
+# Zobrist keys for a disc of each color on each cell and for white being the player to move
+_zobrist_random = random.Random(20240612)
+ZOBRIST_BLACK = [_zobrist_random.getrandbits(64) for _ in range(64)]
+ZOBRIST_WHITE = [_zobrist_random.getrandbits(64) for _ in range(64)]
+ZOBRIST_WHITE_TURN = _zobrist_random.getrandbits(64)
+ZOBRIST_FLIP = [black ^ white for black, white in zip(ZOBRIST_BLACK, ZOBRIST_WHITE)]  # disc changing color
+
+# positional value of a disc on each cell, indexed by [y][x]
+REWARDS = [
+    [80, -20, 20, 10, 10, 20, -20, 80],
+    [-20, -40, -10, -10, -10, -10, -40, -20],
+    [20, -10, 10, 0, 0, 10, -10, 20],
+    [10, -10, 0, 5, 5, 0, -10, 10],
+    [10, -10, 0, 5, 5, 0, -10, 10],
+    [20, -10, 10, 0, 0, 10, -10, 20],
+    [-20, -40, -10, -10, -10, -10, -40, -20],
+    [80, -20, 20, 10, 10, 20, -20, 80],
+]
+CELL_REWARDS = [REWARDS[index >> 3][index & 7] for index in range(64)]  # indexed by bit
+# REWARDS sum of every combination of discs in a row, indexed by [y][byte of row y]
+ROW_REWARDS = [[sum(REWARDS[y][x] for x in range(8) if byte >> x & 1) for byte in range(256)] for y in range(8)]
+
+
 class Othello:
     """Represents a game of Othello."""
 
@@ -23,60 +66,140 @@ class Othello:
         # initialize the starting board
         self.black_score = 2
         self.white_score = 2
-        self.board = [[Cell.EMPTY for _ in range(8)] for _ in range(8)]
-        self.board[3][3] = Cell.WHITE
-        self.board[3][4] = Cell.BLACK
-        self.board[4][3] = Cell.BLACK
-        self.board[4][4] = Cell.WHITE
-        self.board[2][3] = Cell.VALID
-        self.board[3][2] = Cell.VALID
-        self.board[4][5] = Cell.VALID
-        self.board[5][4] = Cell.VALID
+        self.black = square(4, 3) | square(3, 4)
+        self.white = square(3, 3) | square(4, 4)
+        self.valid = square(3, 2) | square(2, 3) | square(5, 4) | square(4, 5)
         self.state = State.BLACK_TURN
+        self.hash = zobrist_hash(self.black, self.white, self.state)
+        self.black_positional = positional_score(self.black)
+        self.white_positional = positional_score(self.white)
+        # placed cell, flipped cells, state, valid cells, hash, black and white positional scores
+        self.history: list[tuple[int, int, State, int, int, int, int]] = []
+
+    @classmethod
+    def from_position(cls, black: int, white: int, state: State) -> "Othello":
+        """Returns a game at the position given by its bitboards, passing or ending it if `state` can't move."""
+        if state not in (State.BLACK_TURN, State.WHITE_TURN):
+            raise ValueError(f"Can't set up position: {state} is not a turn")
+        if black & white:
+            raise ValueError("Can't set up position: Cells are both black and white")
+        game = cls()
+        game.black = black
+        game.white = white
+        game.state = State.WHITE_TURN if state == State.BLACK_TURN else State.BLACK_TURN
+        game._update_state()
+        game.hash = zobrist_hash(black, white, game.state)
+        game.black_positional = positional_score(black)
+        game.white_positional = positional_score(white)
+        return game
+
+    def copy(self) -> "Othello":
+        """Returns an independent copy of the game."""
+        game = Othello.__new__(Othello)
+        game.__dict__.update(self.__dict__)
+        game.history = self.history.copy()
+        return game
+
+    def __deepcopy__(self, memo: dict) -> "Othello":
+        return self.copy()
+
+    @property
+    def board(self) -> list[list[Cell]]:
+        """Returns the board as an 8x8 grid of cells indexed by [y][x]."""
+        board = [[Cell.EMPTY for _ in range(8)] for _ in range(8)]
+        valid = self.valid if self.state in (State.BLACK_TURN, State.WHITE_TURN) else 0
+        for y in range(8):
+            for x in range(8):
+                bit = square(x, y)
+                if self.black & bit:
+                    board[y][x] = Cell.BLACK
+                elif self.white & bit:
+                    board[y][x] = Cell.WHITE
+                elif valid & bit:
+                    board[y][x] = Cell.VALID
+        return board
 
     def make_move(self, move: tuple[int, int]) -> None:
         """Makes a move at the given position and updates the game state."""
         if self.state not in (State.BLACK_TURN, State.WHITE_TURN):
             raise ValueError("Can't make move: Game is over")
-        if self.board[move[1]][move[0]] != Cell.VALID:
+        if not (0 <= move[0] < 8 and 0 <= move[1] < 8) or not self.valid & square(move[0], move[1]):
             raise IndexError(f"Can't make move: Position invalid {move}")
 
-        # reverse cells and update state
-        reverse = Cell.BLACK if self.state == State.BLACK_TURN else Cell.WHITE  # color of current player
-        self.board[move[1]][move[0]] = reverse
-        for cell in self._flipped_cells(move):
-            self.board[cell[1]][cell[0]] = reverse
+        # reverse cells, remember them for undo and update state
+        placed = square(move[0], move[1])
+        index = placed.bit_length() - 1
+        if self.state == State.BLACK_TURN:
+            flipped = flipped_cells(placed, self.black, self.white)
+            self.black |= placed | flipped
+            self.white ^= flipped
+            position_hash = self.hash ^ ZOBRIST_BLACK[index]
+        else:
+            flipped = flipped_cells(placed, self.white, self.black)
+            self.white |= placed | flipped
+            self.black ^= flipped
+            position_hash = self.hash ^ ZOBRIST_WHITE[index] ^ ZOBRIST_WHITE_TURN
+        self.history.append(
+            (placed, flipped, self.state, self.valid, self.hash, self.black_positional, self.white_positional)
+        )
+
+        gained = CELL_REWARDS[index]
+        flipped_rewards = 0
+        rest = flipped
+        while rest:
+            bit = rest & -rest
+            index = bit.bit_length() - 1
+            position_hash ^= ZOBRIST_FLIP[index]
+            flipped_rewards += CELL_REWARDS[index]
+            rest ^= bit
+        if self.state == State.BLACK_TURN:
+            self.black_positional += gained + flipped_rewards
+            self.white_positional -= flipped_rewards
+        else:
+            self.white_positional += gained + flipped_rewards
+            self.black_positional -= flipped_rewards
+
         self._update_state()
+        if self.state == State.WHITE_TURN:
+            position_hash ^= ZOBRIST_WHITE_TURN
+        self.hash = position_hash
+
+    def undo_move(self) -> None:
+        """Takes back the last move and restores the game to the state before it."""
+        if not self.history:
+            raise ValueError("Can't undo move: No moves made")
+
+        placed, flipped, self.state, self.valid, self.hash, self.black_positional, self.white_positional = (
+            self.history.pop()
+        )
+        if self.state == State.BLACK_TURN:
+            self.black ^= placed | flipped
+            self.white |= flipped
+        else:
+            self.white ^= placed | flipped
+            self.black |= flipped
+        self.black_score = self.black.bit_count()
+        self.white_score = self.white.bit_count()
 
     def get_valid_moves(self) -> list[tuple[int, int]]:
         """Returns a list of valid moves for the current turn."""
         if self.state not in (State.BLACK_TURN, State.WHITE_TURN):
             return []
-        return [(x, y) for x in range(8) for y in range(8) if self.board[y][x] == Cell.VALID]
+        return cells(self.valid)
 
     def _update_state(self) -> None:
-        self.black_score = sum(row.count(Cell.BLACK) for row in self.board)
-        self.white_score = sum(row.count(Cell.WHITE) for row in self.board)
-
-        # check if game is over
-        if self._is_full() or self.black_score == 0 or self.white_score == 0:
-            if self.black_score > self.white_score:
-                self.state = State.BLACK_WON
-            elif self.black_score < self.white_score:
-                self.state = State.WHITE_WON
-            else:
-                self.state = State.DRAW
-            return
+        self.black_score = self.black.bit_count()
+        self.white_score = self.white.bit_count()
 
         # switch turn and update valid cells
         self.state = State.WHITE_TURN if self.state == State.BLACK_TURN else State.BLACK_TURN
         self._update_valid_cells()
-        if len(self.get_valid_moves()) == 0:
+        if self.valid == 0:
             # print("No valid moves. Skipping turn.")  # for debug
             self.state = State.WHITE_TURN if self.state == State.BLACK_TURN else State.BLACK_TURN
             self._update_valid_cells()
-            if len(self.get_valid_moves()) == 0:
-                # print("No valid moves even for the other player. Game over.")  # for debug
+            if self.valid == 0:
+                # no valid moves for either player, this also covers a full board and a wiped out color
                 if self.black_score > self.white_score:
                     self.state = State.BLACK_WON
                 elif self.black_score < self.white_score:
@@ -84,36 +207,121 @@ class Othello:
                 else:
                     self.state = State.DRAW
 
-    def _is_full(self) -> bool:
-        for y in range(8):
-            for x in range(8):
-                if self.board[y][x] in (Cell.EMPTY, Cell.VALID):
-                    return False
-        return True
-
     def _update_valid_cells(self) -> None:
-        for y in range(8):
-            for x in range(8):
-                if self.board[y][x] == Cell.VALID:
-                    self.board[y][x] = Cell.EMPTY
-                if self.board[y][x] == Cell.EMPTY and self._flipped_cells((x, y)) != []:
-                    self.board[y][x] = Cell.VALID
-
-    def _flipped_cells(self, move: tuple[int, int]) -> list[tuple[int, int]]:
-        player = Cell.BLACK if self.state == State.BLACK_TURN else Cell.WHITE
-        opponent = Cell.WHITE if self.state == State.BLACK_TURN else Cell.BLACK
-        flipped = []
-        x, y = move[0], move[1]
-        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (1, -1), (-1, 1)):
-            flipped += self._flipped_cells_in_direction(x, y, dx, dy, player, opponent)
-        return flipped
-
-    def _flipped_cells_in_direction(self, x: int, y: int, dx: int, dy: int, player: Cell, opponent: Cell) -> list[tuple[int, int]]:
-        flipped = []
-        x, y = x + dx, y + dy
-        while 0 <= x < 8 and 0 <= y < 8 and self.board[y][x] == opponent:
-            flipped.append((x, y))
-            x, y = x + dx, y + dy
-        if not (0 <= x < 8 and 0 <= y < 8) or self.board[y][x] != player:
-            return []
-        return flipped
+        if self.state == State.BLACK_TURN:
+            self.valid = valid_cells(self.black, self.white)
+        else:
+            self.valid = valid_cells(self.white, self.black)
+
+
+def square(x: int, y: int) -> int:
+    """Returns the bitboard with only the cell (x, y) set."""
+    return 1 << (y * 8 + x)
+
+
+def zobrist_hash(black: int, white: int, state: State) -> int:
+    """Computes the Zobrist hash of a position from scratch."""
+    position_hash = ZOBRIST_WHITE_TURN if state == State.WHITE_TURN else 0
+    for index in range(64):
+        if black >> index & 1:
+            position_hash ^= ZOBRIST_BLACK[index]
+        elif white >> index & 1:
+            position_hash ^= ZOBRIST_WHITE[index]
+    return position_hash
+
+
+def positional_score(bitboard: int) -> int:
+    """Returns the sum of REWARDS over the cells set in the bitboard."""
+    return (
+        ROW_REWARDS[0][bitboard & 0xFF]
+        + ROW_REWARDS[1][bitboard >> 8 & 0xFF]
+        + ROW_REWARDS[2][bitboard >> 16 & 0xFF]
+        + ROW_REWARDS[3][bitboard >> 24 & 0xFF]
+        + ROW_REWARDS[4][bitboard >> 32 & 0xFF]
+        + ROW_REWARDS[5][bitboard >> 40 & 0xFF]
+        + ROW_REWARDS[6][bitboard >> 48 & 0xFF]
+        + ROW_REWARDS[7][bitboard >> 56]
+    )
+
+
+def cells(bitboard: int) -> list[tuple[int, int]]:
+    """Returns the (x, y) coordinates of every cell set in the bitboard."""
+    result = []
+    while bitboard:
+        bit = bitboard & -bitboard
+        index = bit.bit_length() - 1
+        result.append((index & 7, index >> 3))
+        bitboard ^= bit
+    return result
+
+
+def valid_cells(player: int, opponent: int) -> int:
+    """Returns the bitboard of cells where the player can move."""
+    empty = ~(player | opponent) & FULL
+    inner = opponent & INNER_FILES
+    valid = 0
+    # walk every direction at once over contiguous opponent cells, at most 6 can be flipped in a line
+    for shift, mask in DIRECTIONS:
+        line = opponent if mask == FULL else inner
+        if shift > 0:
+            run = (player << shift) & line
+            run |= (run << shift) & line
+            run |= (run << shift) & line
+            run |= (run << shift) & line
+            run |= (run << shift) & line
+            run |= (run << shift) & line
+            valid |= (run << shift) & empty
+        else:
+            shift = -shift
+            run = (player >> shift) & line
+            run |= (run >> shift) & line
+            run |= (run >> shift) & line
+            run |= (run >> shift) & line
+            run |= (run >> shift) & line
+            run |= (run >> shift) & line
+            valid |= (run >> shift) & empty
+    return valid
+
+
+def can_move(player: int, opponent: int) -> bool:
+    """Returns whether the player has a valid move, stopping at the first one found."""
+    empty = ~(player | opponent) & FULL
+    inner = opponent & INNER_FILES
+    for shift, mask in DIRECTIONS:
+        line = opponent if mask == FULL else inner
+        if shift > 0:
+            run = (player << shift) & line
+            while run:
+                run <<= shift
+                if run & empty:
+                    return True
+                run &= line
+        else:
+            shift = -shift
+            run = (player >> shift) & line
+            while run:
+                run >>= shift
+                if run & empty:
+                    return True
+                run &= line
+    return False
+
+
+def flipped_cells(placed: int, player: int, opponent: int) -> int:
+    """Returns the bitboard of opponent cells flipped by placing a disc on the `placed` cell."""
+    flipped = 0
+    for shift, mask in DIRECTIONS:
+        run = 0
+        if shift > 0:
+            cell = (placed << shift) & mask
+            while cell & opponent:
+                run |= cell
+                cell = (cell << shift) & mask
+        else:
+            cell = (placed >> -shift) & mask
+            while cell & opponent:
+                run |= cell
+                cell = (cell >> -shift) & mask
+        if cell & player:
+            flipped |= run
+    return flipped
@@ -0,0 +1,64 @@
+from .othello import Othello, zobrist_hash
+
+# A symmetry of the board is a number 0-7 whose bits select the steps applied in this order:
+# 4 transposes the board (x, y) -> (y, x), 1 mirrors it (x -> 7 - x) and 2 flips it (y -> 7 - y).
+# 0 is the identity, together they are the 8 rotations and reflections of the square.
+SYMMETRIES = range(8)
+
+
+def transform(bitboard: int, symmetry: int) -> int:
+    """Returns the bitboard with the symmetry applied."""
+    if symmetry & 4:
+        t = 0x0F0F0F0F00000000 & (bitboard ^ (bitboard << 28))
+        bitboard ^= t ^ (t >> 28)
+        t = 0x3333000033330000 & (bitboard ^ (bitboard << 14))
+        bitboard ^= t ^ (t >> 14)
+        t = 0x5500550055005500 & (bitboard ^ (bitboard << 7))
+        bitboard ^= t ^ (t >> 7)
+    if symmetry & 1:
+        bitboard = (bitboard >> 1) & 0x5555555555555555 | (bitboard & 0x5555555555555555) << 1
+        bitboard = (bitboard >> 2) & 0x3333333333333333 | (bitboard & 0x3333333333333333) << 2
+        bitboard = (bitboard >> 4) & 0x0F0F0F0F0F0F0F0F | (bitboard & 0x0F0F0F0F0F0F0F0F) << 4
+    if symmetry & 2:
+        bitboard = int.from_bytes(bitboard.to_bytes(8, "little"), "big")
+    return bitboard
+
+
+def transform_move(move: tuple[int, int], symmetry: int) -> tuple[int, int]:
+    """Returns the cell (x, y) the symmetry moves the given cell to."""
+    x, y = move
+    if symmetry & 4:
+        x, y = y, x
+    if symmetry & 1:
+        x = 7 - x
+    if symmetry & 2:
+        y = 7 - y
+    return x, y
+
+
+def inverse_move(move: tuple[int, int], symmetry: int) -> tuple[int, int]:
+    """Returns the cell (x, y) the symmetry moves to the given cell, undoing `transform_move`."""
+    x, y = move
+    if symmetry & 2:
+        y = 7 - y
+    if symmetry & 1:
+        x = 7 - x
+    if symmetry & 4:
+        x, y = y, x
+    return x, y
+
+
+def canonical(black: int, white: int) -> tuple[int, int, int]:
+    """Returns the canonical form of a position, its lowest orientation, with the symmetry that maps to it."""
+    best = (black, white, 0)
+    for symmetry in SYMMETRIES[1:]:
+        transformed = (transform(black, symmetry), transform(white, symmetry), symmetry)
+        if transformed < best:
+            best = transformed
+    return best
+
+
+def canonical_hash(game: Othello) -> tuple[int, int]:
+    """Returns the Zobrist hash of the canonical form of the game position and the symmetry that maps to it."""
+    black, white, symmetry = canonical(game.black, game.white)
+    return zobrist_hash(black, white, game.state), symmetry
@@ -0,0 +1,43 @@
+from enum import Enum
+
+
+class Bound(Enum):
+    EXACT = 1
+    LOWER = 2  # search failed high, the value is at least this
+    UPPER = 3  # search failed low, the value is at most this
+
+
+class Replacement(Enum):
+    ALWAYS = 1  # a new entry always overwrites the slot
+    DEPTH = 2  # a new entry overwrites the slot only if it is for the same position or searched as deep
+
+
+class TranspositionTable:
+    """Fixed-size table of searched positions indexed by Zobrist hash."""
+
+    def __init__(self, size: int = 1 << 16, replacement: Replacement = Replacement.DEPTH) -> None:
+        if size <= 0:
+            raise ValueError(f"Transposition table size must be positive: {size}")
+        self.size = size
+        self.replacement = replacement
+        # each slot holds (key, depth, bound, value, best move) or None
+        self.entries: list[tuple[int, int, Bound, int, tuple[int, int]] | None] = [None] * size
+
+    def probe(self, key: int) -> tuple[int, int, Bound, int, tuple[int, int]] | None:
+        """Returns the entry stored for the position, or None if there is none."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, bound: Bound, value: int, move: tuple[int, int]) -> None:
+        """Stores a search result for the position according to the replacement policy."""
+        index = key % self.size
+        entry = self.entries[index]
+        if self.replacement == Replacement.DEPTH and entry is not None and entry[0] != key and entry[1] > depth:
+            return
+        self.entries[index] = (key, depth, bound, value, move)
+
+    def clear(self) -> None:
+        """Removes every entry from the table."""
+        self.entries = [None] * self.size
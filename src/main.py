@@ -1,12 +1,15 @@
 from core.othello import Othello, State
 from core.ui import print_board, user_move, print_score, print_state
-from core.mcts import mcts_move
+from core.mcts import MCTSPlayer
 from core.minimax import minimax_move
+from core.transposition import TranspositionTable
 
 def main():
     print("Welcome to Othello!")
 
     game = Othello()
+    mcts = MCTSPlayer(10)
+    table = TranspositionTable()  # kept by the minimax player for the whole game
     round = 0
     while game.state == State.BLACK_TURN or game.state == State.WHITE_TURN:
         round += 1
@@ -14,7 +17,7 @@ def main():
         print_board(game.board)
         print_score(game)
         try:
-            move = mcts_move(game, 10) if game.state == State.BLACK_TURN else minimax_move(game, 1)
+            move = mcts.move(game) if game.state == State.BLACK_TURN else minimax_move(game, 1, table)
             print_state(game)
             print(f"      Move: {chr(ord('A') + move[0])}{str(move[1] + 1)}")
             game.make_move(move)
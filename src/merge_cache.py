@@ -0,0 +1,23 @@
+import argparse
+import time
+from core.endgame_cache import merge_cache
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Merge solved endgames from journal files into the endgame cache.")
+    parser.add_argument("cache", help="endgame cache file to update")
+    parser.add_argument("journals", nargs="+", help="journal files the games record their solved endgames to")
+    parser.add_argument("--interval", type=float, help="keep merging every this many seconds instead of once")
+    args = parser.parse_args()
+
+    while True:
+        start_time = time.time()
+        positions = merge_cache(args.cache, args.journals)
+        print(f"{positions} positions in {args.cache}, merged in {time.time() - start_time:.2f}s")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
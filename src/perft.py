@@ -0,0 +1,31 @@
+from core.othello import Othello, State
+
+# the move generation of the pure Python backend, run_perft.py --backend python counts it
+
+
+def perft(game: Othello, depth: int) -> int:
+    """Counts the leaves of the game tree to the given depth, a pass is a ply of its own and a finished game a leaf."""
+    if depth == 0 or game.state not in (State.BLACK_TURN, State.WHITE_TURN):
+        return 1
+    if depth == 1:
+        return game.valid.bit_count()  # every move leads to exactly one leaf
+
+    nodes = 0
+    turn = game.state
+    for move in game.get_valid_moves():
+        game.make_move(move)
+        if game.state == turn:  # the opponent has to pass
+            nodes += perft(game, depth - 2)
+        else:
+            nodes += perft(game, depth - 1)
+        game.undo_move()
+    return nodes
+
+
+def parse_position(board: str, player: str) -> Othello:
+    """Sets up a game from a board string of 64 cells X, O or - and the player to move, X or O."""
+    if len(board) != 64 or set(board) - set("XO-") or player not in ("X", "O"):
+        raise ValueError(f"Invalid position: {board} {player}")
+    black = sum(1 << index for index, cell in enumerate(board) if cell == "X")
+    white = sum(1 << index for index, cell in enumerate(board) if cell == "O")
+    return Othello.from_position(black, white, State.BLACK_TURN if player == "X" else State.WHITE_TURN)
@@ -1,102 +1,125 @@
+import os
+import random
+import sys
 import time
 from typing import Callable
 
 import numpy as np
-from colorama import Fore, Style
-from core_numba.mcts import mcts_move
-from core_numba.minimax import minimax_move
+from core_numba.book import OpeningBook
+from core_numba.endgame import solve_endgame
+from core_numba.mcts import MCTSStats, mcts_move, seed_numba
+from core_numba.minimax import SearchStats, minimax_move
 from core_numba.othello import (
     STATE_BLACK_TURN,
     STATE_BLACK_WON,
-    STATE_DRAW,
     STATE_WHITE_TURN,
     STATE_WHITE_WON,
     get_valid_moves,
     init_game,
     make_move,
 )
+from core_numba.transposition import new_table
 from numba import njit
 
-GAMES_COUNT = 20
-MINIMAX_DEPTH = 2
-MCTS_SIMULATIONS = 20
-
-
-def run_benchmarks() -> None:
-    print(f"{Fore.MAGENTA}Running benchmarks...{Style.RESET_ALL}\n")
-    start_time = time.time()
-
-    print(f"{Fore.BLUE}Random vs Random:{Style.RESET_ALL}")
-    benchmark_game(random_move_wrapper, random_move_wrapper)
-
-    print(f"{Fore.BLUE}BLACK Minimax vs WHITE Random:{Style.RESET_ALL}")
-    benchmark_game(minimax_move_wrapper, random_move_wrapper)
-
-    print(f"{Fore.BLUE}WHITE Minimax vs BLACK Random:{Style.RESET_ALL}")
-    benchmark_game(random_move_wrapper, minimax_move_wrapper)
-
-    print(f"{Fore.BLUE}Minimax vs Minimax:{Style.RESET_ALL}")
-    benchmark_game(minimax_move_wrapper, minimax_move_wrapper)
-
-    print(f"{Fore.BLUE}BLACK MCTS vs WHITE Random:{Style.RESET_ALL}")
-    benchmark_game(mcts_move_wrapper, random_move_wrapper)
-
-    print(f"{Fore.BLUE}WHITE MCTS vs BLACK Random:{Style.RESET_ALL}")
-    benchmark_game(random_move_wrapper, mcts_move_wrapper)
-
-    print(f"{Fore.BLUE}MCTS vs MCTS:{Style.RESET_ALL}")
-    benchmark_game(mcts_move_wrapper, mcts_move_wrapper)
-
-    print(f"{Fore.BLUE}BLACK Minimax vs WHITE MCTS:{Style.RESET_ALL}")
-    benchmark_game(minimax_move_wrapper, mcts_move_wrapper)
-
-    print(f"{Fore.BLUE}WHITE Minimax vs BLACK MCTS:{Style.RESET_ALL}")
-    benchmark_game(mcts_move_wrapper, minimax_move_wrapper)
-
-    print(f"{Fore.MAGENTA}Total time elapsed: {time.time() - start_time:.2f}{Style.RESET_ALL}")
-
-
-def benchmark_game(
-    BLACK_AI: Callable[[np.ndarray, np.int32, np.int32, np.int32], np.ndarray],
-    WHITE_AI: Callable[[np.ndarray, np.int32, np.int32, np.int32], np.ndarray],
-) -> None:
-    black_wins = 0
-    white_wins = 0
-    draws = 0
-    start_time = time.time()
+# the games of the Numba backend, run_benchmark.py --backend numba plays them
+
+# final state, latency of every AI move, then the nodes and seconds of the [BLACK, WHITE] AIs of a played game
+GameResult = tuple[int, list[float], list[int], list[float]]
+
+# final states of the games won by BLACK and by WHITE, for run_benchmark.py
+BLACK_WON = STATE_BLACK_WON
+WHITE_WON = STATE_WHITE_WON
+
+
+def warm_up() -> None:
+    """Compile the Numba functions of a worker process so compilation doesn't count as move latency."""
+    board, black_score, white_score, state = init_game()
+    for _ in range(4):  # past the random opening moves of minimax
+        move = random_move(board, black_score, white_score, state)
+        board, black_score, white_score, state, _ = make_move(board, black_score, white_score, state, move[0], move[1])
+    minimax_move(board, black_score, white_score, state, 1, new_table(1), stats=SearchStats())
+    mcts_move(board, black_score, white_score, state, 1, stats=MCTSStats())
+    mcts_move(board, black_score, white_score, state, 1, 2)
+    while True:  # play on to a small endgame for the solver, new games if one ends before
+        if state not in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+            board, black_score, white_score, state = init_game()
+        elif black_score + white_score >= 60:
+            break
+        move = random_move(board, black_score, white_score, state)
+        board, black_score, white_score, state, _ = make_move(board, black_score, white_score, state, move[0], move[1])
+    solve_endgame(board, black_score, white_score, state)
+
+
+def benchmark_game(task: tuple[str, str, int, int, int, str, str | None, str | None]) -> GameResult:
+    """Plays one seeded game and returns its result.
+
+    The nodes and seconds are counted per player, so the nodes of different engines never add up.
+    """
+    black, white, depth, iterations, playouts, seed, book_path, _ = task
+    random.seed(seed)
+    seed_numba(random.getrandbits(32))
+    book = None if book_path is None else OpeningBook(book_path)
+    BLACK_AI = _player(black, depth, iterations, playouts, book)
+    WHITE_AI = _player(white, depth, iterations, playouts, book)
+    latencies = []
+    nodes = [0, 0]
+    seconds = [0.0, 0.0]
+
+    board, black_score, white_score, state = init_game()
+    while state in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+        black_turn = state == STATE_BLACK_TURN
+        start_time = time.perf_counter()
+        move, move_nodes = (
+            BLACK_AI(board, black_score, white_score, state)
+            if black_turn
+            else WHITE_AI(board, black_score, white_score, state)
+        )
+        latency = time.perf_counter() - start_time
+        if move[0] == -1 and move[1] == -1:  # No valid moves
+            board, black_score, white_score, state, _ = make_move(board, black_score, white_score, state, 0, 0)
+            continue
+        board, black_score, white_score, state, success = make_move(
+            board, black_score, white_score, state, move[0], move[1]
+        )
+        if not success:
+            print(f"Invalid move attempted: {list(move)}")
+            break
+        if (black if black_turn else white) != "random":
+            latencies.append(latency)
+            if move_nodes is not None:  # the endgame solver counts no nodes, so its time is left out too
+                nodes[not black_turn] += move_nodes
+                seconds[not black_turn] += latency
+    if book is not None:
+        book.close()
+    return int(state), latencies, nodes, seconds
+
+
+def _player(
+    name: str, depth: int, iterations: int, playouts: int, book: OpeningBook | None
+) -> Callable[[np.ndarray, np.int32, np.int32, np.int32], tuple[tuple[int, int], int | None]]:
+    """Returns the move function of a player, which returns the move and the nodes searched for it, None if solved."""
+    if name == "minimax":
+        table = new_table()  # one per game, so results don't depend on the games a worker played before
+
+        def play(board, black_score, white_score, state):
+            stats = SearchStats()
+            return (
+                minimax_move(board, black_score, white_score, state, depth, table, stats=stats, book=book),
+                None if stats.endgame else stats.nodes,
+            )
 
-    for i in range(GAMES_COUNT):
-        current_time = time.time() - start_time
-        print(f"  game: {i + 1}/{GAMES_COUNT}  elapsed time: {current_time:.2f}s", end="\r")
+        return play
+    if name == "mcts":
 
-        board, black_score, white_score, state = init_game()
-        while state in (STATE_BLACK_TURN, STATE_WHITE_TURN):
-            move = (
-                BLACK_AI(board, black_score, white_score, state)
-                if state == STATE_BLACK_TURN
-                else WHITE_AI(board, black_score, white_score, state)
+        def play(board, black_score, white_score, state):
+            stats = MCTSStats()
+            return (
+                mcts_move(board, black_score, white_score, state, iterations, playouts, stats=stats, book=book),
+                stats.playouts,
             )
-            if move[0] == -1 and move[1] == -1:  # No valid moves
-                board, black_score, white_score, state, _ = make_move(board, black_score, white_score, state, 0, 0)
-                continue
-            board, black_score, white_score, state, success = make_move(
-                board, black_score, white_score, state, move[0], move[1]
-            )
-            if not success:
-                print(f"Invalid move attempted: {move.tolist()}")
-                break
-
-        if state == STATE_BLACK_WON:
-            black_wins += 1
-        elif state == STATE_WHITE_WON:
-            white_wins += 1
-        else:
-            draws += 1
 
-    print(f"  elapsed time: {time.time() - start_time:.2f}s                     ")
-    print(f"    BLACK wins: {black_wins} {black_wins / GAMES_COUNT * 100:.0f}%")
-    print(f"    WHITE wins: {white_wins} {white_wins / GAMES_COUNT * 100:.0f}%")
-    print(f"         draws: {draws} {draws / GAMES_COUNT * 100:.0f}%\n")
+        return play
+    return lambda board, black_score, white_score, state: (random_move(board, black_score, white_score, state), 0)
 
 
 @njit
@@ -113,32 +136,10 @@ def random_move(
     return moves[move_idx]
 
 
-def random_move_wrapper(
-    board: np.ndarray,
-    black_score: np.int32,
-    white_score: np.int32,
-    state: np.int32,
-):
-    return random_move(board, black_score, white_score, state)
-
-
-def minimax_move_wrapper(
-    board: np.ndarray,
-    black_score: np.int32,
-    white_score: np.int32,
-    state: np.int32,
-):
-    return minimax_move(board, black_score, white_score, state, MINIMAX_DEPTH)
-
-
-def mcts_move_wrapper(
-    board: np.ndarray,
-    black_score: np.int32,
-    white_score: np.int32,
-    state: np.int32,
-):
-    return mcts_move(board, black_score, white_score, state, MCTS_SIMULATIONS)
-
-
 if __name__ == "__main__":
-    run_benchmarks()
+    # python benchmark.py [options] runs run_benchmark.py with the Numba backend
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    import run_benchmark
+
+    sys.argv[1:1] = ["--backend", "numba"]
+    run_benchmark.main()
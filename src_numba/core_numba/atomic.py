@@ -0,0 +1,42 @@
+from numba import types
+from numba.core import cgutils
+from numba.extending import intrinsic
+
+# Atomic read-modify-write operations on one element of a 1D integer array, for compiled code running
+# in several threads at once. Numba has no atomics for the CPU, so these emit the LLVM instructions.
+
+
+@intrinsic
+def atomic_add(typingctx, array, index, value):
+    """Add `value` to array[index] atomically and return the previous value."""
+    if not isinstance(array, types.Array) or not isinstance(array.dtype, types.Integer):
+        return None
+
+    def codegen(context, builder, signature, args):
+        array_type, index_type, _ = signature.args
+        ary = context.make_array(array_type)(context, builder, args[0])
+        index = context.cast(builder, args[1], index_type, types.intp)
+        pointer = cgutils.get_item_pointer(context, builder, array_type, ary, [index], wraparound=False)
+        return builder.atomic_rmw("add", pointer, args[2], "acq_rel")
+
+    return array.dtype(array, types.intp, array.dtype), codegen
+
+
+@intrinsic
+def atomic_cas(typingctx, array, index, expected, value):
+    """Set array[index] to `value` atomically if it equals `expected`. Returns the value it had before.
+
+    The swap happened if the returned value equals `expected`.
+    """
+    if not isinstance(array, types.Array) or not isinstance(array.dtype, types.Integer):
+        return None
+
+    def codegen(context, builder, signature, args):
+        array_type, index_type, _, _ = signature.args
+        ary = context.make_array(array_type)(context, builder, args[0])
+        index = context.cast(builder, args[1], index_type, types.intp)
+        pointer = cgutils.get_item_pointer(context, builder, array_type, ary, [index], wraparound=False)
+        result = builder.cmpxchg(pointer, args[2], args[3], "acq_rel", "acquire")
+        return builder.extract_value(result, 0)
+
+    return array.dtype(array, types.intp, array.dtype, array.dtype), codegen
@@ -0,0 +1,109 @@
+import numpy as np
+from numba import njit, prange
+
+from .othello import (
+    CELL_BLACK,
+    CELL_VALID,
+    CELL_WHITE,
+    STATE_BLACK_TURN,
+    STATE_WHITE_TURN,
+    init_game,
+    make_move,
+    mark_valid_cells,
+    update_state,
+)
+
+
+def init_batch(count: int):
+    """Return (boards, states) of `count` games at the starting position."""
+    board, _, _, state = init_game()
+    boards = np.repeat(board[np.newaxis], count, axis=0)
+    states = np.full(count, state, dtype=np.int32)
+    return boards, states
+
+
+def simulate_batch(boards: np.ndarray, states: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Play random moves in all games of the batch in lockstep until every game is over.
+
+    `boards` is an (N, 8, 8) array of boards and `states` the N game states. The valid cells are marked
+    again before the first move, so boards holding only discs work too. The inputs are not modified.
+    Returns the N final states.
+    Every step draws one random number per game from `rng` and advances all unfinished games by
+    one move in parallel, passes happen inside `make_move` and finished games are skipped.
+    """
+    boards = boards.copy()
+    states = states.astype(np.int32)
+    black_scores, white_scores = _count_discs(boards)
+    _mark_batch(boards, black_scores, white_scores, states)
+    while _advance(boards, black_scores, white_scores, states, rng.random(states.shape[0])):
+        pass
+    return states
+
+
+@njit(parallel=True)
+def _advance(
+    boards: np.ndarray,
+    black_scores: np.ndarray,
+    white_scores: np.ndarray,
+    states: np.ndarray,
+    draws: np.ndarray,
+):
+    """Make one random move in every unfinished game. Returns how many games are still running after it."""
+    running = 0
+    for i in prange(boards.shape[0]):
+        if states[i] != STATE_BLACK_TURN and states[i] != STATE_WHITE_TURN:
+            continue
+        board = boards[i]
+
+        count = 0
+        for y in range(8):
+            for x in range(8):
+                if board[y, x] == CELL_VALID:
+                    count += 1
+        if count == 0:  # the player has to pass, or nobody can move and the game is over
+            _, black_scores[i], white_scores[i], states[i], _ = update_state(
+                board, black_scores[i], white_scores[i], states[i]
+            )
+            if states[i] == STATE_BLACK_TURN or states[i] == STATE_WHITE_TURN:
+                running += 1
+            continue
+        pick = min(int(draws[i] * count), count - 1)
+        for index in range(64):
+            if board[index >> 3, index & 7] == CELL_VALID:
+                if pick == 0:
+                    break
+                pick -= 1
+
+        _, black_scores[i], white_scores[i], states[i], _ = make_move(
+            board, black_scores[i], white_scores[i], states[i], index & 7, index >> 3
+        )
+        if states[i] == STATE_BLACK_TURN or states[i] == STATE_WHITE_TURN:
+            running += 1
+    return running
+
+
+@njit(parallel=True)
+def _mark_batch(boards: np.ndarray, black_scores: np.ndarray, white_scores: np.ndarray, states: np.ndarray):
+    """Mark the valid cells of every unfinished game, passing or ending the games whose player can't move."""
+    for i in prange(boards.shape[0]):
+        if states[i] != STATE_BLACK_TURN and states[i] != STATE_WHITE_TURN:
+            continue
+        if mark_valid_cells(boards[i], states[i]) == 0:
+            _, black_scores[i], white_scores[i], states[i], _ = update_state(
+                boards[i], black_scores[i], white_scores[i], states[i]
+            )
+
+
+@njit(parallel=True)
+def _count_discs(boards: np.ndarray):
+    """Return the black and white disc counts of every board."""
+    black_scores = np.zeros(boards.shape[0], dtype=np.int32)
+    white_scores = np.zeros(boards.shape[0], dtype=np.int32)
+    for i in prange(boards.shape[0]):
+        for y in range(8):
+            for x in range(8):
+                if boards[i, y, x] == CELL_BLACK:
+                    black_scores[i] += 1
+                elif boards[i, y, x] == CELL_WHITE:
+                    white_scores[i] += 1
+    return black_scores, white_scores
@@ -0,0 +1,54 @@
+import mmap
+import struct
+
+import numpy as np
+
+from .symmetry import canonical_hash, inverse_move
+
+# Same file layout as core.book, all little-endian: MAGIC, the entry count as u64, the sorted u64
+# Zobrist keys of canonical positions, then one byte per key with the index y * 8 + x of the move
+# to play in the canonical orientation
+MAGIC = b"OTHBOOK2"
+HEADER = struct.Struct("<8sQ")
+
+
+class OpeningBook:
+    """Read-only opening book file of src/build_book.py, memory-mapped with NumPy views of its keys and moves."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            self.map.close()
+            raise ValueError(f"Invalid opening book: {path}")
+        magic, self.size = HEADER.unpack_from(self.map)
+        if magic != MAGIC or len(self.map) != HEADER.size + self.size * 9:
+            self.map.close()
+            raise ValueError(f"Invalid opening book: {path}")
+        self.keys = np.frombuffer(self.map, dtype="<u8", count=self.size, offset=HEADER.size)
+        self.moves = np.frombuffer(self.map, dtype=np.uint8, count=self.size, offset=HEADER.size + self.size * 8)
+
+    def move(self, board: np.ndarray, state: int):
+        """Returns the book move (x, y) of the position, or None if it isn't in the book."""
+        key, symmetry = canonical_hash(board, state)
+        move = self.lookup(key)
+        return None if move is None else inverse_move(move, symmetry)
+
+    def lookup(self, key: np.uint64):
+        """Returns the book move (x, y) stored for the canonical hash, or None if it isn't in the book."""
+        index = np.searchsorted(self.keys, np.uint64(key))
+        if index == self.size or self.keys[index] != key:
+            return None
+        move = int(self.moves[index])
+        return move & 7, move >> 3
+
+    def close(self):
+        # the views must go before the map they point into can be closed
+        del self.keys, self.moves
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,257 @@
+import numpy as np
+from numba import njit
+
+from .othello import (
+    CELL_BLACK,
+    CELL_WHITE,
+    STATE_BLACK_TURN,
+    STATE_WHITE_TURN,
+    bit_count,
+)
+
+# minimax_move hands the game to the solver once this few cells are empty
+ENDGAME_EMPTIES = 11
+
+# below this many empty cells moves are ordered by parity only, counting replies costs more than it saves
+_FASTEST_FIRST_EMPTIES = 7
+
+# bit i of a bitboard is the cell (x, y) with i = y * 8 + x, as in core.othello
+_NOT_A_FILE = np.uint64(0xFEFEFEFEFEFEFEFE)  # every cell except x == 0
+_NOT_H_FILE = np.uint64(0x7F7F7F7F7F7F7F7F)  # every cell except x == 7
+_INNER_FILES = _NOT_A_FILE & _NOT_H_FILE
+_FULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+# shift and mask of each direction, positive shifts go left, negative go right
+# the mask removes cells that wrapped around to the opposite edge of the board
+_SHIFTS = np.array([1, -1, 8, -8, 9, -9, 7, -7], dtype=np.int64)
+_MASKS = np.array(
+    [_NOT_A_FILE, _NOT_H_FILE, _FULL, _FULL, _NOT_A_FILE, _NOT_H_FILE, _NOT_H_FILE, _NOT_A_FILE], dtype=np.uint64
+)
+
+QUADRANTS = np.array(
+    [0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000], dtype=np.uint64
+)
+
+
+def solve_endgame(board: np.ndarray, black_score: int, white_score: int, state: int, exact: bool = True):
+    """Search the game to the end. Return the final score with the best move (x, y) for the current player.
+
+    The score is the final disc difference from the current player's point of view. With `exact`
+    set to False the search only tells a win, draw or loss apart and the score is 1, 0 or -1.
+    """
+    if state not in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+        raise ValueError("Can't solve endgame: Game is over")
+    black, white = _bitboards(board)
+    player, opponent = (black, white) if state == STATE_BLACK_TURN else (white, black)
+    orders = np.empty((64 - black_score - white_score + 1, 64), dtype=np.int64)  # move order of every ply
+    score, index = _solve_root(np.uint64(player), np.uint64(opponent), exact, orders)
+    return int(score), (index & 7, index >> 3)
+
+
+@njit
+def _solve_root(player: np.uint64, opponent: np.uint64, exact: bool, orders: np.ndarray):
+    """Search every move of the player to move. Return (score, index y * 8 + x of the best move)."""
+    alpha, beta = (-64, 64) if exact else (-1, 1)
+    empty = ~(player | opponent)
+    order = orders[bit_count(empty)]
+    best_value = -65
+    best_index = -1
+    for i in range(_order_moves(player, opponent, _valid_cells(player, opponent), empty, order)):
+        index = order[i] & 63
+        placed = np.uint64(1) << np.uint64(index)
+        flipped = _flipped_cells(placed, player, opponent)
+        value = -_solve(opponent ^ flipped, player | placed | flipped, -beta, -alpha, False, orders)
+        if value > best_value:
+            best_value = value
+            best_index = index
+            alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+
+    if not exact:
+        best_value = (best_value > 0) - (best_value < 0)
+    return best_value, best_index
+
+
+@njit
+def _solve(player: np.uint64, opponent: np.uint64, alpha: int, beta: int, passed: bool, orders: np.ndarray):
+    """Negamax over the final disc difference for the player to move.
+
+    orders[empty cells] holds the move order of the position, no position below it on the path has as many empty cells.
+    """
+    empty = ~(player | opponent)
+    empty_cells = bit_count(empty)
+    if empty_cells == 0:
+        return bit_count(player) - bit_count(opponent)
+    if empty_cells <= 4:
+        return _solve_few(player, opponent, empty, alpha, beta, passed)
+
+    moves = _valid_cells(player, opponent)
+    if moves == 0:
+        if passed:
+            return bit_count(player) - bit_count(opponent)
+        return -_solve(opponent, player, -beta, -alpha, True, orders)
+
+    best_value = -65
+    if empty_cells < _FASTEST_FIRST_EMPTIES:
+        odd = _odd_quadrants(empty)
+        for cells in (moves & odd, moves & ~odd):
+            while cells:
+                placed = cells & (~cells + np.uint64(1))
+                cells ^= placed
+                flipped = _flipped_cells(placed, player, opponent)
+                value = -_solve(opponent ^ flipped, player | placed | flipped, -beta, -alpha, False, orders)
+                if value > best_value:
+                    best_value = value
+                    alpha = max(alpha, value)
+                    if alpha >= beta:
+                        return best_value
+        return best_value
+
+    order = orders[empty_cells]
+    for i in range(_order_moves(player, opponent, moves, empty, order)):
+        placed = np.uint64(1) << np.uint64(order[i] & 63)
+        flipped = _flipped_cells(placed, player, opponent)
+        value = -_solve(opponent ^ flipped, player | placed | flipped, -beta, -alpha, False, orders)
+        if value > best_value:
+            best_value = value
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+    return best_value
+
+
+@njit
+def _solve_few(player: np.uint64, opponent: np.uint64, empty: np.uint64, alpha: int, beta: int, passed: bool):
+    """Solve positions with at most 4 empty cells by trying each empty cell directly, odd regions first."""
+    if empty & (empty - np.uint64(1)) == 0:
+        return _solve_last(player, opponent, empty)
+
+    best_value = -65
+    moved = False
+    odd = _odd_quadrants(empty)
+    for cells in (empty & odd, empty & ~odd):
+        while cells:
+            placed = cells & (~cells + np.uint64(1))
+            cells ^= placed
+            flipped = _flipped_cells(placed, player, opponent)
+            if flipped == 0:
+                continue
+            moved = True
+            value = -_solve_few(opponent ^ flipped, player | placed | flipped, empty ^ placed, -beta, -alpha, False)
+            if value > best_value:
+                best_value = value
+                alpha = max(alpha, value)
+                if alpha >= beta:
+                    return best_value
+    if moved:
+        return best_value
+    if passed:
+        return bit_count(player) - bit_count(opponent)
+    return -_solve_few(opponent, player, empty, -beta, -alpha, True)
+
+
+@njit
+def _solve_last(player: np.uint64, opponent: np.uint64, placed: np.uint64):
+    """Return the final disc difference with one empty cell left."""
+    flipped = _flipped_cells(placed, player, opponent)
+    if flipped:
+        return bit_count(player | placed | flipped) - bit_count(opponent ^ flipped)
+    flipped = _flipped_cells(placed, opponent, player)
+    if flipped:
+        return bit_count(player ^ flipped) - bit_count(opponent | placed | flipped)
+    return bit_count(player) - bit_count(opponent)  # neither player can fill the last cell
+
+
+@njit
+def _order_moves(player: np.uint64, opponent: np.uint64, moves: np.uint64, empty: np.uint64, order: np.ndarray):
+    """Write the moves into `order`, the ones leaving the opponent fewest replies first, and return how many there are.
+
+    Each entry is (replies * 2 + outside an odd quadrant) * 64 + index y * 8 + x, so sorting the entries
+    sorts the moves and `entry & 63` gives the cell back.
+    """
+    odd = _odd_quadrants(empty)
+    count = 0
+    while moves:
+        placed = moves & (~moves + np.uint64(1))
+        moves ^= placed
+        flipped = _flipped_cells(placed, player, opponent)
+        replies = bit_count(_valid_cells(opponent ^ flipped, player | placed | flipped))
+        entry = (replies * 2 + (placed & odd == 0)) * 64 + bit_count(placed - np.uint64(1))
+        i = count  # insertion sort, there are only a handful of moves
+        while i > 0 and order[i - 1] > entry:
+            order[i] = order[i - 1]
+            i -= 1
+        order[i] = entry
+        count += 1
+    return count
+
+
+@njit
+def _odd_quadrants(empty: np.uint64):
+    """Return the mask of the quadrants that have an odd number of empty cells."""
+    odd = np.uint64(0)
+    for quadrant in QUADRANTS:
+        if bit_count(empty & quadrant) & 1:
+            odd |= quadrant
+    return odd
+
+
+@njit
+def _valid_cells(player: np.uint64, opponent: np.uint64):
+    """Return the bitboard of cells where the player can move."""
+    empty = ~(player | opponent)
+    inner = opponent & _INNER_FILES
+    valid = np.uint64(0)
+    # walk every direction at once over contiguous opponent cells, at most 6 can be flipped in a line
+    for d in range(8):
+        line = opponent if _MASKS[d] == _FULL else inner
+        shift = np.uint64(abs(_SHIFTS[d]))
+        if _SHIFTS[d] > 0:
+            run = (player << shift) & line
+            for _ in range(5):
+                run |= (run << shift) & line
+            valid |= (run << shift) & empty
+        else:
+            run = (player >> shift) & line
+            for _ in range(5):
+                run |= (run >> shift) & line
+            valid |= (run >> shift) & empty
+    return valid
+
+
+@njit
+def _flipped_cells(placed: np.uint64, player: np.uint64, opponent: np.uint64):
+    """Return the bitboard of opponent cells flipped by placing a disc on the `placed` cell."""
+    flipped = np.uint64(0)
+    for d in range(8):
+        mask = _MASKS[d]
+        shift = np.uint64(abs(_SHIFTS[d]))
+        run = np.uint64(0)
+        if _SHIFTS[d] > 0:
+            cell = (placed << shift) & mask
+            while cell & opponent:
+                run |= cell
+                cell = (cell << shift) & mask
+        else:
+            cell = (placed >> shift) & mask
+            while cell & opponent:
+                run |= cell
+                cell = (cell >> shift) & mask
+        if cell & player:
+            flipped |= run
+    return flipped
+
+
+@njit
+def _bitboards(board: np.ndarray):
+    """Return the (black, white) bitboards of the board."""
+    black = np.uint64(0)
+    white = np.uint64(0)
+    for index in range(64):
+        cell = board[index >> 3, index & 7]
+        if cell == CELL_BLACK:
+            black |= np.uint64(1) << np.uint64(index)
+        elif cell == CELL_WHITE:
+            white |= np.uint64(1) << np.uint64(index)
+    return black, white
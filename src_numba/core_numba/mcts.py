@@ -1,152 +1,715 @@
 from __future__ import annotations
 
-import math
+import multiprocessing
+import os
 import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
+from .atomic import atomic_add, atomic_cas
+from .book import OpeningBook
 from .othello import (
+    CELL_VALID,
     STATE_BLACK_TURN,
     STATE_BLACK_WON,
-    STATE_DRAW,
     STATE_WHITE_TURN,
     STATE_WHITE_WON,
+    bit_count,
     get_valid_moves,
+    init_game,
     make_move,
+    random_valid_cell,
+    splitmix64,
 )
 
+# most nodes of a pool sized from the iterations, 30 MB, so a large budget for a timed search doesn't preallocate it
+MAX_DEFAULT_CAPACITY = 1 << 20
 
-def mcts_move(board: np.ndarray, black_score: int, white_score: int, state: int, iterations: int):
-    """Returns the best move for the current turn using Monte Carlo Tree Search."""
+# simulated games per thread between two checks of the clock, or of the early stop when searching with threads
+SEARCH_CHUNK = 256
 
-    valid_moves = [tuple(move) for move in get_valid_moves(board, state)]  # Convert to list of tuples
-    root = Node(None, (-1, -1), state, valid_moves)
 
-    for _ in range(iterations):
-        node = root
-        # Create a new game state for simulation
-        sim_board = board.copy()
-        sim_black_score = black_score
-        sim_white_score = white_score
-        sim_state = state
+def mcts_move(
+    board: np.ndarray,
+    black_score: int,
+    white_score: int,
+    state: int,
+    iterations: int,
+    playouts: int = 1,
+    capacity: int = None,
+    stats: MCTSStats = None,
+    book: OpeningBook = None,
+    threads: int = 1,
+    time_limit: float = None,
+):
+    """Returns the best move for the current turn using Monte Carlo Tree Search.
 
-        # SELECT promising child node while current node is fully expanded and non-terminal
-        while node.unexplored == [] and node.children != []:
-            node = node.select_child()
-            sim_board, sim_black_score, sim_white_score, sim_state, success = make_move(
-                sim_board, sim_black_score, sim_white_score, sim_state, node.move[0], node.move[1]
+    `capacity` defaults to one node per iteration up to MAX_DEFAULT_CAPACITY, see NodePool.search for the rest.
+    """
+    if book is not None:
+        book_move = book.move(board, state)
+        if book_move is not None and book_move in [tuple(move) for move in get_valid_moves(board, state)]:
+            return book_move
+    start_time = time.perf_counter()
+    tree = NodePool(min(iterations + 1, MAX_DEFAULT_CAPACITY) if capacity is None else capacity)
+    tree.search(board, black_score, white_score, state, iterations, playouts, threads, time_limit, early_stop=True)
+    if stats is not None:
+        stats.iterations += tree.iterations
+        stats.playouts += tree.iterations * playouts
+        stats.tree_size = tree.size
+        stats.tree_bytes = tree.nbytes
+        stats.max_depth = max(stats.max_depth, _max_depth(tree.parent, tree.size))
+        stats.root_visits = {move: visits for move, visits, _ in tree.root_children()}
+        stats.elapsed = time.perf_counter() - start_time
+    return tree.most_visited_move()
+
+
+class MCTSStats:
+    """Counters of a Monte Carlo Tree Search, filled in when passed to `mcts_move`.
+
+    `iterations`, `playouts` and `max_depth` add up over the searches, the others describe the latest one.
+    """
+
+    def __init__(self):
+        self.iterations = 0
+        self.playouts = 0  # simulated games
+        self.tree_size = 0  # nodes used in the pool
+        self.tree_bytes = 0  # memory of the whole pool, used or not
+        self.max_depth = 0  # deepest node, in moves below the root
+        self.root_visits = {}  # visits of every move (x, y) at the root
+        self.elapsed = 0.0  # seconds spent in the latest search
+
+    @property
+    def bytes_per_node(self):
+        """Average memory of a used node of the pool."""
+        return self.tree_bytes / self.tree_size if self.tree_size else 0.0
+
+    def as_dict(self):
+        """Returns the fields by name, the root visits as [x, y, visits] lists for JSON."""
+        return {
+            **vars(self),
+            "root_visits": [[*move, visits] for move, visits in self.root_visits.items()],
+            "bytes_per_node": self.bytes_per_node,
+        }
+
+
+class NodePool:
+    """Preallocated struct-of-arrays storage of an MCTS tree, node 0 is the root."""
+
+    def __init__(self, capacity: int):
+        if capacity < 2:
+            raise ValueError(f"Node pool capacity must leave room for a child of the root: {capacity}")
+        self.capacity = capacity
+        self.size = 0
+        self.iterations = 0  # run by the latest search
+        self.parent = np.empty(capacity, dtype=np.int32)  # -1 marks no node in the links
+        self.first_child = np.empty(capacity, dtype=np.int32)
+        self.next_sibling = np.empty(capacity, dtype=np.int32)
+        self.move = np.empty(capacity, dtype=np.int8)  # cell index y * 8 + x of the move leading to the node
+        self.turn = np.empty(capacity, dtype=np.int8)  # player who made that move
+        self.visits = np.empty(capacity, dtype=np.int32)
+        self.wins = np.empty(capacity, dtype=np.int32)
+        self.unexplored = np.empty(capacity, dtype=np.uint64)  # bitmask of the valid moves without a child
+
+    @property
+    def nbytes(self):
+        """Memory of the node arrays in bytes, 30 per node of the capacity."""
+        return sum(
+            array.nbytes
+            for array in (
+                self.parent,
+                self.first_child,
+                self.next_sibling,
+                self.move,
+                self.turn,
+                self.visits,
+                self.wins,
+                self.unexplored,
             )
-            if not success:
-                break
-
-        # EXPAND one random unexplored move
-        if node.unexplored != []:
-            explored_move = node.unexplored[random.randint(0, len(node.unexplored) - 1)]
-            explored_turn = sim_state
-            sim_board, sim_black_score, sim_white_score, sim_state, success = make_move(
-                sim_board, sim_black_score, sim_white_score, sim_state, explored_move[0], explored_move[1]
+        )
+
+    def search(
+        self,
+        board: np.ndarray,
+        black_score: int,
+        white_score: int,
+        state: int,
+        iterations: int,
+        playouts: int = 1,
+        threads: int = 1,
+        time_limit: float = None,
+        early_stop: bool = False,
+    ):
+        """Build a new tree from the given position with the given number of iterations and playouts per leaf.
+
+        `threads` share one tree, `time_limit` is in seconds and `early_stop` ends once the best move can't change.
+        """
+        if playouts < 1:
+            raise ValueError(f"Playouts per leaf must be positive: {playouts}")
+        if threads < 1:
+            raise ValueError(f"Search threads must be positive: {threads}")
+        if time_limit is not None:
+            # compile before the clock starts, so the time limit and the measured speed cover only the search
+            NodePool(2).search(board, black_score, white_score, state, 1, playouts)
+        start_time = time.perf_counter()
+        deadline = None if time_limit is None else start_time + time_limit
+        _init_root(
+            board,
+            state,
+            self.parent,
+            self.first_child,
+            self.next_sibling,
+            self.move,
+            self.turn,
+            self.visits,
+            self.wins,
+            self.unexplored,
+        )
+        self.size = 1
+        self.iterations = 0
+
+        # compiled code can't read the clock and the threads don't check the early stop, so those searches
+        # run in chunks with the checks in between
+        if deadline is None and (threads == 1 or not early_stop):
+            chunk = iterations
+        else:
+            chunk = max(1, SEARCH_CHUNK // playouts) * threads
+        executor = ThreadPoolExecutor(threads) if threads > 1 else None  # one for all the chunks
+        try:
+            while self.iterations < iterations:
+                count = min(chunk, iterations - self.iterations)
+                if deadline is not None:
+                    # the first chunk measures the speed, then no more iterations than fit in the time left
+                    now = time.perf_counter()
+                    fitting = int((deadline - now) * self.iterations / (now - start_time)) if self.iterations else 0
+                    count = min(count, max(threads, fitting))
+                if threads == 1:
+                    remaining = iterations - self.iterations if early_stop else -1  # checked after every iteration
+                    self.size, completed = self._search_serial(
+                        board, black_score, white_score, state, count, playouts, remaining
+                    )
+                else:
+                    self._search_threads(board, black_score, white_score, state, count, playouts, threads, executor)
+                    completed = count
+                self.iterations += completed
+                if completed < count or deadline is not None and time.perf_counter() >= deadline:
+                    break
+                if early_stop and self._visit_lead() > (iterations - self.iterations) * playouts:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def _search_serial(
+        self,
+        board: np.ndarray,
+        black_score: int,
+        white_score: int,
+        state: int,
+        iterations: int,
+        playouts: int,
+        remaining: int,
+    ):
+        size = np.array([self.size], dtype=np.int64)
+        completed = _run_search(
+            board,
+            black_score,
+            white_score,
+            state,
+            iterations,
+            playouts,
+            remaining,
+            _draw_seeds(1)[0],
+            0,  # no virtual loss without other threads
+            True,  # the playouts of a leaf run in parallel threads
+            size,
+            np.zeros(1, dtype=np.int64),
+            self.parent,
+            self.first_child,
+            self.next_sibling,
+            self.move,
+            self.turn,
+            self.visits,
+            self.wins,
+            self.unexplored,
+        )
+        return int(size[0]), completed
+
+    def _search_threads(
+        self,
+        board: np.ndarray,
+        black_score: int,
+        white_score: int,
+        state: int,
+        iterations: int,
+        playouts: int,
+        threads: int,
+        executor: ThreadPoolExecutor,
+    ):
+        size = np.array([self.size], dtype=np.int64)
+        lock = np.zeros(1, dtype=np.int64)
+        seeds = _draw_seeds(threads)
+        workers = [
+            executor.submit(
+                _run_search,
+                board,
+                black_score,
+                white_score,
+                state,
+                iterations // threads + (thread < iterations % threads),
+                playouts,
+                -1,
+                seeds[thread],
+                VIRTUAL_LOSS,
+                False,  # the playouts of a thread run in that thread
+                size,
+                lock,
+                self.parent,
+                self.first_child,
+                self.next_sibling,
+                self.move,
+                self.turn,
+                self.visits,
+                self.wins,
+                self.unexplored,
             )
-            if success:
-                # Remove explored move and add child node
-                node.unexplored.remove(explored_move)
-                child = Node(
-                    node, explored_move, explored_turn, [tuple(move) for move in get_valid_moves(sim_board, sim_state)]
-                )
-                node.children.append(child)
-                node = child
-
-        # SIMULATE while game is not over
-        winner = simulate_game(sim_board, sim_black_score, sim_white_score, sim_state)
-
-        # BACKPROPAGATE simulation result
-        while node is not None:
-            node.visits += 1
-            node.wins += compute_win_increment(winner, node.turn)
-            node = node.parent
-
-    return root.get_most_visited().move
-
-
-class Node:
-    """Node of the MCTS tree."""
-
-    def __init__(self, parent: Node | None, move: tuple[int, int], turn: int, unexplored: list[tuple[int, int]]):
-        self.move = move
-        self.turn = turn
-        self.unexplored = unexplored
-        self.parent = parent
-        self.children: list[Node] = []
-        self.visits = 0
-        self.wins = 0
-
-    def select_child(self) -> Node:
-        selected = self.children[0]
-        best_uct = float("-inf")
-        ln_total = 2 * math.log(self.visits)
-        for child in self.children:
-            # UCT formula extracted to Numba function
-            child_uct = compute_uct(child.wins, child.visits, ln_total)
-            if child_uct > best_uct:
-                best_uct = child_uct
-                selected = child
-        return selected
-
-    def get_most_visited(self) -> Node:
-        # Use Numba function to find index of most visited child
-        visits = np.array([child.visits for child in self.children], dtype=np.int32)
-        max_idx = find_most_visited(visits)
-        return self.children[max_idx]
+            for thread in range(threads)
+        ]
+        for worker in workers:
+            worker.result()
+        self.size = int(size[0])
 
+    def _visit_lead(self):
+        return _visit_lead(self.first_child, self.next_sibling, self.visits, 0)
 
-@njit
-def compute_uct(wins: np.int32, visits: np.int32, ln_total: np.float64) -> np.float64:
-    """Compute the UCT value for a node."""
-    return (wins / visits) + np.sqrt(ln_total / visits)
+    def root_children(self):
+        """Returns (move, visits, wins) of every child of the root."""
+        children = []
+        child = self.first_child[0]
+        while child != -1:
+            index = int(self.move[child])
+            children.append(((index & 7, index >> 3), int(self.visits[child]), int(self.wins[child])))
+            child = self.next_sibling[child]
+        return children
 
+    def most_visited_move(self):
+        """Returns the move of the most visited child of the root as (x, y)."""
+        if self.first_child[0] == -1:
+            raise ValueError("Can't pick move: The root has no children")
+        index = self.move[_most_visited_child(self.first_child, self.next_sibling, self.visits, 0)]
+        return int(index) & 7, int(index) >> 3
 
-@njit
-def simulate_game(board: np.ndarray, black_score: np.int32, white_score: np.int32, state: np.int32):
-    """Simulate a random game from the given state and return the winner."""
-    sim_board = board.copy()
-    sim_black_score = black_score
-    sim_white_score = white_score
-    sim_state = state
-
-    while sim_state in (STATE_BLACK_TURN, STATE_WHITE_TURN):
-        moves = get_valid_moves(sim_board, sim_state)
-        if moves.shape[0] == 0:
-            sim_board, sim_black_score, sim_white_score, sim_state, _ = make_move(
-                sim_board, sim_black_score, sim_white_score, sim_state, 0, 0
+
+class ParallelMCTS:
+    """Root-parallel Monte Carlo Tree Search over a persistent pool of worker processes."""
+
+    def __init__(self, iterations: int, workers: int = None, seed: int = None):
+        self.iterations = iterations
+        self.workers = workers or os.cpu_count() or 1
+        self.random = random.Random(seed)
+        # fresh worker processes, forking after parallel Numba code can deadlock the children
+        self.pool = multiprocessing.get_context("spawn").Pool(self.workers, initializer=_warm_up)
+
+    def move(self, board: np.ndarray, black_score: int, white_score: int, state: int):
+        """Returns the most visited move over the trees of all workers."""
+        tasks = [
+            (board, black_score, white_score, state, self.iterations, self.random.getrandbits(32))
+            for _ in range(self.workers)
+        ]
+        totals = {}
+        for statistics in self.pool.map(_root_statistics, tasks):
+            for move, visits, wins in statistics:
+                total = totals.setdefault(move, [0, 0])
+                total[0] += visits
+                total[1] += wins
+        return max(totals, key=lambda move: totals[move][0])
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _warm_up():
+    """Compile the Numba functions of a worker process before its first task."""
+    board, black_score, white_score, state = init_game()
+    mcts_move(board, black_score, white_score, state, 1)
+
+
+def _root_statistics(task):
+    """Worker task of ParallelMCTS, returns (move, visits, wins) of every root child."""
+    board, black_score, white_score, state, iterations, seed = task
+    seed_numba(seed)
+    tree = NodePool(iterations + 1)
+    tree.search(board, black_score, white_score, state, iterations)
+    return tree.root_children()
+
+
+# visits a thread adds, as losses, to every node on its path while its iteration is in flight, so the
+# threads descending at the same time spread over different branches
+VIRTUAL_LOSS = 1
+
+
+@njit(nogil=True)
+def _run_search(
+    board: np.ndarray,
+    black_score: np.int32,
+    white_score: np.int32,
+    state: np.int32,
+    iterations: int,
+    playouts: int,
+    remaining: int,
+    seed: int,
+    virtual_loss: int,
+    parallel_playouts: bool,
+    size: np.ndarray,
+    lock: np.ndarray,
+    parent: np.ndarray,
+    first_child: np.ndarray,
+    next_sibling: np.ndarray,
+    move: np.ndarray,
+    turn: np.ndarray,
+    visits: np.ndarray,
+    wins: np.ndarray,
+    unexplored: np.ndarray,
+):
+    """Run MCTS iterations on the tree, alone or in several threads at once. Returns the iterations run.
+
+    `remaining` is the iterations left for the early stop, -1 never stops, and `seed` starts the SplitMix64 stream.
+    """
+    _, rng = splitmix64(np.uint64(seed))
+    sim_board = np.empty_like(board)
+    playout_boards = np.empty((playouts, 8, 8), dtype=board.dtype)
+    playout_winners = np.empty(playouts, dtype=np.int32)
+    completed = 0
+    while completed < iterations:
+        sim_board[:, :] = board
+        node, sim_black_score, sim_white_score, sim_state = _select(
+            sim_board,
+            black_score,
+            white_score,
+            state,
+            virtual_loss,
+            first_child,
+            next_sibling,
+            move,
+            visits,
+            wins,
+            unexplored,
+        )
+        node, sim_black_score, sim_white_score, sim_state, rng = _expand(
+            node,
+            sim_board,
+            sim_black_score,
+            sim_white_score,
+            sim_state,
+            rng,
+            virtual_loss,
+            size,
+            lock,
+            parent,
+            first_child,
+            next_sibling,
+            move,
+            turn,
+            visits,
+            wins,
+            unexplored,
+        )
+        rng, stream = splitmix64(rng)
+        if parallel_playouts and playouts > 1:
+            _parallel_play_outs(
+                sim_board, sim_black_score, sim_white_score, sim_state, stream, playout_boards, playout_winners
             )
-            continue
-        move_idx = np.random.randint(0, moves.shape[0])
-        sim_board, sim_black_score, sim_white_score, sim_state, success = make_move(
-            sim_board, sim_black_score, sim_white_score, sim_state, moves[move_idx, 0], moves[move_idx, 1]
+        else:
+            _play_outs(sim_board, sim_black_score, sim_white_score, sim_state, stream, playout_boards, playout_winners)
+        _backpropagate(node, playout_winners, virtual_loss, parent, turn, visits, wins)
+
+        completed += 1
+        if remaining >= 0 and _visit_lead(first_child, next_sibling, visits, 0) > (remaining - completed) * playouts:
+            break
+    return completed
+
+
+@njit
+def _select(
+    board: np.ndarray,
+    black_score: np.int32,
+    white_score: np.int32,
+    state: np.int32,
+    virtual_loss: int,
+    first_child: np.ndarray,
+    next_sibling: np.ndarray,
+    move: np.ndarray,
+    visits: np.ndarray,
+    wins: np.ndarray,
+    unexplored: np.ndarray,
+):
+    """SELECT promising children from the root and play them. Returns (node, black_score, white_score, state)."""
+    node = 0
+    _add_virtual_loss(visits, wins, node, virtual_loss)
+    while unexplored[node] == 0 and first_child[node] != -1:
+        node = _select_child(first_child, next_sibling, visits, wins, node)
+        _add_virtual_loss(visits, wins, node, virtual_loss)
+        board, black_score, white_score, state, _ = make_move(
+            board, black_score, white_score, state, move[node] & 7, move[node] >> 3
         )
-        if not success:
+    return node, black_score, white_score, state
+
+
+@njit
+def _expand(
+    node: int,
+    board: np.ndarray,
+    black_score: np.int32,
+    white_score: np.int32,
+    state: np.int32,
+    rng: np.uint64,
+    virtual_loss: int,
+    size: np.ndarray,
+    lock: np.ndarray,
+    parent: np.ndarray,
+    first_child: np.ndarray,
+    next_sibling: np.ndarray,
+    move: np.ndarray,
+    turn: np.ndarray,
+    visits: np.ndarray,
+    wins: np.ndarray,
+    unexplored: np.ndarray,
+):
+    """EXPAND a random unexplored move if there is room. Returns (node, black_score, white_score, state, rng)."""
+    capacity = parent.shape[0]
+    if unexplored[node] == 0 or size[0] >= capacity:
+        return node, black_score, white_score, state, rng
+    child = -1
+    index = -1
+    # the move and its node are claimed together under the spin lock, so a claimed move always gets its node
+    while atomic_cas(lock, 0, 0, 1) != 0:
+        pass
+    mask = unexplored[node]
+    reserved = 0 if node == 0 else bit_count(unexplored[0])  # room kept for the root, so it always expands
+    if mask != 0 and size[0] + reserved < capacity:  # checked again now that no other thread changes them
+        index, rng = _random_bit(mask, rng)
+        unexplored[node] = mask ^ (np.uint64(1) << np.uint64(index))
+        child = size[0]
+        size[0] = child + 1
+    atomic_cas(lock, 0, 1, 0)
+    if child == -1:
+        return node, black_score, white_score, state, rng
+
+    explored_turn = state
+    board, black_score, white_score, state, _ = make_move(board, black_score, white_score, state, index & 7, index >> 3)
+    parent[child] = node
+    first_child[child] = -1
+    move[child] = index
+    turn[child] = explored_turn
+    visits[child] = virtual_loss
+    wins[child] = -virtual_loss
+    unexplored[child] = valid_mask(board, state)
+    # the child is complete before other threads can reach it
+    while True:
+        first = first_child[node]
+        next_sibling[child] = first
+        if atomic_cas(first_child, node, first, child) == first:
             break
+    return child, black_score, white_score, state, rng
+
+
+@njit
+def _backpropagate(
+    node: int,
+    winners: np.ndarray,
+    virtual_loss: int,
+    parent: np.ndarray,
+    turn: np.ndarray,
+    visits: np.ndarray,
+    wins: np.ndarray,
+):
+    """BACKPROPAGATE the winners of the playouts to the root, a win counts 1 and a loss -1 for who moved into a node."""
+    black_wins = 0
+    white_wins = 0
+    for winner in winners:
+        if winner == STATE_BLACK_WON:
+            black_wins += 1
+        elif winner == STATE_WHITE_WON:
+            white_wins += 1
+    while node != -1:
+        atomic_add(visits, node, winners.shape[0] - virtual_loss)
+        if turn[node] == STATE_BLACK_TURN:
+            atomic_add(wins, node, virtual_loss + black_wins - white_wins)
+        else:
+            atomic_add(wins, node, virtual_loss + white_wins - black_wins)
+        node = parent[node]
+
+
+@njit
+def _add_virtual_loss(visits: np.ndarray, wins: np.ndarray, node: int, virtual_loss: int):
+    """Count a visit lost by the node until its iteration backpropagates, nothing without a virtual loss."""
+    if virtual_loss != 0:
+        atomic_add(visits, node, virtual_loss)
+        atomic_add(wins, node, -virtual_loss)
+
 
-    return sim_state
+@njit
+def _init_root(
+    board: np.ndarray,
+    state: np.int32,
+    parent: np.ndarray,
+    first_child: np.ndarray,
+    next_sibling: np.ndarray,
+    move: np.ndarray,
+    turn: np.ndarray,
+    visits: np.ndarray,
+    wins: np.ndarray,
+    unexplored: np.ndarray,
+):
+    """Make node 0 the root of a new tree for the given position."""
+    parent[0] = -1
+    first_child[0] = -1
+    next_sibling[0] = -1
+    move[0] = -1
+    turn[0] = state
+    visits[0] = 0
+    wins[0] = 0
+    unexplored[0] = valid_mask(board, state)
 
 
 @njit
-def compute_win_increment(winner: np.int32, turn: np.int32):
-    """Compute the win increment for backpropagation."""
-    if winner == STATE_DRAW:
-        return 0
-    if (winner == STATE_BLACK_WON) == (turn == STATE_BLACK_TURN):
-        return 1
-    return -1
+def _draw_seeds(count: int):
+    """Return `count` seeds drawn from the random generator of Numba compiled functions."""
+    return np.random.randint(0, 1 << 62, count)
 
 
 @njit
-def find_most_visited(visits: np.ndarray):
-    """Return the index of the child with the most visits."""
-    max_idx = 0
-    max_visits = visits[0]
-    for i in range(1, visits.shape[0]):
-        if visits[i] > max_visits:
-            max_visits = visits[i]
-            max_idx = i
-    return max_idx
+def _max_depth(parent: np.ndarray, size: int):
+    """Return the depth of the deepest of the first `size` nodes, parents always come before their children."""
+    depth = np.zeros(size, dtype=np.int32)
+    deepest = 0
+    for node in range(1, size):
+        depth[node] = depth[parent[node]] + 1
+        deepest = max(deepest, depth[node])
+    return deepest
+
+
+@njit
+def _select_child(first_child: np.ndarray, next_sibling: np.ndarray, visits: np.ndarray, wins: np.ndarray, node: int):
+    """Return the child of the node with the highest UCT value."""
+    selected = first_child[node]
+    best_uct = -np.inf
+    ln_total = 2 * np.log(visits[node])
+    child = first_child[node]
+    while child != -1:
+        child_uct = compute_uct(wins[child], visits[child], ln_total)
+        if child_uct > best_uct:
+            best_uct = child_uct
+            selected = child
+        child = next_sibling[child]
+    return selected
+
+
+@njit
+def _visit_lead(first_child: np.ndarray, next_sibling: np.ndarray, visits: np.ndarray, node: int):
+    """Return how many more visits the most visited child of the node has than any other move."""
+    first = 0  # moves without a child have no visits
+    second = 0
+    child = first_child[node]
+    while child != -1:
+        if visits[child] > first:
+            second = first
+            first = visits[child]
+        elif visits[child] > second:
+            second = visits[child]
+        child = next_sibling[child]
+    return first - second
+
+
+@njit
+def _most_visited_child(first_child: np.ndarray, next_sibling: np.ndarray, visits: np.ndarray, node: int):
+    """Return the child of the node with the most visits."""
+    selected = first_child[node]
+    child = first_child[node]
+    while child != -1:
+        if visits[child] > visits[selected]:
+            selected = child
+        child = next_sibling[child]
+    return selected
+
+
+@njit
+def _random_bit(mask: np.uint64, rng: np.uint64):
+    """Return the index of a random set bit of the non-empty mask drawn from SplitMix64 state `rng`, and the new rng."""
+    rng, value = splitmix64(rng)
+    pick = int(value % np.uint64(bit_count(mask)))
+    for index in range(64):
+        if mask >> np.uint64(index) & np.uint64(1):
+            if pick == 0:
+                return index, rng
+            pick -= 1
+    return -1, rng
+
+
+@njit
+def valid_mask(board: np.ndarray, state: np.int32):
+    """Return the valid cells of the board as a bitmask of y * 8 + x, empty once the game is over."""
+    mask = np.uint64(0)
+    if state not in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+        return mask
+    for y in range(8):
+        for x in range(8):
+            if board[y, x] == CELL_VALID:
+                mask |= np.uint64(1) << np.uint64(y * 8 + x)
+    return mask
+
+
+@njit
+def compute_uct(wins: np.int32, visits: np.int32, ln_total: np.float64) -> np.float64:
+    """Compute the UCT value for a node."""
+    return (wins / visits) + np.sqrt(ln_total / visits)
+
+
+@njit
+def seed_numba(seed: int):
+    """Seed the random generator used inside Numba compiled functions."""
+    np.random.seed(seed)
+
+
+@njit
+def play_out(board: np.ndarray, black_score: np.int32, white_score: np.int32, state: np.int32, rng: np.uint64):
+    """Play random moves drawn from the SplitMix64 state `rng` on the board in place and return the winner."""
+    while state in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+        index, rng = random_valid_cell(board, rng)
+        if index == -1:
+            break
+        board, black_score, white_score, state, _ = make_move(
+            board, black_score, white_score, state, index & 7, index >> 3
+        )
+    return state
+
+
+def _play_outs(
+    board: np.ndarray,
+    black_score: np.int32,
+    white_score: np.int32,
+    state: np.int32,
+    rng: np.uint64,
+    boards: np.ndarray,
+    winners: np.ndarray,
+):
+    """Simulate one random game per entry of `winners` and store their winners, `boards` is scratch space."""
+    for k in prange(winners.shape[0]):
+        boards[k] = board
+        _, stream = splitmix64(rng + np.uint64(k))  # a stream per game, so the threads don't change the results
+        winners[k] = play_out(boards[k], black_score, white_score, state, stream)
+
+
+# the same games in parallel threads, only for a caller that doesn't run in threads of its own
+_parallel_play_outs = njit(parallel=True)(_play_outs)
+_play_outs = njit(_play_outs)
@@ -1,19 +1,39 @@
 import random
+import time
 from typing import Tuple
 
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 from .othello import (
     CELL_BLACK,
+    CELL_EMPTY,
+    CELL_VALID,
     CELL_WHITE,
+    DIRECTIONS,
     STATE_BLACK_TURN,
     STATE_BLACK_WON,
     STATE_DRAW,
     STATE_WHITE_TURN,
     STATE_WHITE_WON,
+    ZOBRIST,
+    ZOBRIST_WHITE_TURN,
+    count_flips_in_direction,
+    flips_any,
     get_valid_moves,
     make_move,
+    zobrist_hash,
+)
+from .book import OpeningBook
+from .endgame import ENDGAME_EMPTIES, solve_endgame
+from .transposition import (
+    BOUND_EXACT,
+    BOUND_LOWER,
+    BOUND_UPPER,
+    REPLACE_DEPTH,
+    new_table,
+    tt_probe,
+    tt_store,
 )
 
 # Rewards matrix for board evaluation (NumPy array for Numba)
@@ -31,67 +51,244 @@ REWARDS = np.array(
     dtype=np.int32,
 )
 
+# Score of a won game and bound of the alpha-beta window, far above any REWARDS sum
+SCORE_INF = 1 << 30
+
+# Indices of the search counters in SearchStats.counters
+STAT_NODES = 0
+STAT_LEAVES = 1
+STAT_CUTOFFS = 2
+STAT_EXPANDED = 3
+STAT_CHILDREN = 4
+
+
+def minimax_move(
+    board: np.ndarray,
+    black_score: int,
+    white_score: int,
+    state: int,
+    depth: int,
+    table: np.ndarray = None,
+    replacement: int = REPLACE_DEPTH,
+    stats: "SearchStats" = None,
+    book: OpeningBook = None,
+) -> Tuple[int, int]:
+    """Use minimax to find a good move for the current player. Returns (x, y).
+
+    `table` is a transposition table from `transposition.new_table`, a new one is used by default.
+    Pass `stats` to read the search counters and time after the search. A position found in the `book`
+    is played without searching.
+    """
+
+    start_time = time.perf_counter()
+    try:
+        if stats is not None:
+            stats.depth = 0
+            stats.endgame = False
+            stats.score = None
+        moves = [tuple(move) for move in get_valid_moves(board, state)]  # Convert to list of tuples
+        if not moves:
+            return (-1, -1)
+        if len(moves) == 1:
+            return moves[0]
+        if book is not None:
+            book_move = book.move(board, state)
+            if book_move in moves:  # also rules out a hash collision with a position of other moves
+                return book_move
+
+        round_idx = _calculate_round(board)
+        if round_idx < 3:
+            return moves[random.randint(0, len(moves) - 1)]
 
-def minimax_move(board: np.ndarray, black_score: int, white_score: int, state: int, depth: int) -> Tuple[int, int]:
-    """Use minimax to find a good move for the current player. Returns (x, y)."""
+        empty_cells = 64 - black_score - white_score
+        if empty_cells <= ENDGAME_EMPTIES:  # few enough cells left to search to the end
+            score, move = solve_endgame(board, black_score, white_score, state)
+            if stats is not None:
+                stats.depth = empty_cells
+                stats.endgame = True
+                stats.score = score
+            return move
 
-    moves = [tuple(move) for move in get_valid_moves(board, state)]  # Convert to list of tuples
-    if not moves:
-        return (-1, -1)
-    if len(moves) == 1:
-        return moves[0]
+        # Adjust depth based on round
+        if round_idx > 40:
+            depth += 2
+        elif round_idx > 30:
+            depth += 1
 
-    round_idx = _calculate_round(board)
-    if round_idx < 3:
-        return moves[random.randint(0, len(moves) - 1)]
+        table = new_table() if table is None else table
+        boards = np.empty((depth + 1, 8, 8), dtype=board.dtype)  # one board per ply, reused by every node
+        boards[0] = board
+        positional = _positional_score(board)
+        position_hash = np.uint64(zobrist_hash(board, state))
+        # the compiled search always counts, into a scratch array when nobody reads the counters
+        counters = np.zeros(5, dtype=np.int64) if stats is None else stats.counters
+        _, best_index = _minimax(
+            boards,
+            0,
+            black_score,
+            white_score,
+            state,
+            positional,
+            position_hash,
+            state,
+            depth,
+            -SCORE_INF,
+            SCORE_INF,
+            table,
+            replacement,
+            counters,
+        )
+        if stats is not None:
+            stats.depth = depth
+        return best_index & 7, best_index >> 3
+    finally:
+        if stats is not None:
+            stats.elapsed = time.perf_counter() - start_time
+
+
+class SearchStats:
+    """Counters of a minimax search, filled in when passed to `minimax_move`."""
+
+    def __init__(self):
+        self.counters = np.zeros(5, dtype=np.int64)  # indexed by the STAT_* constants
+        self.depth = 0
+        self.endgame = False  # whether the latest move came from the endgame solver
+        self.score = None  # final disc difference for the current player solved by the latest move, if any
+        self.elapsed = 0.0
+
+    @property
+    def nodes(self):
+        """Positions visited, including the ones answered by the transposition table."""
+        return int(self.counters[STAT_NODES])
+
+    @property
+    def leaves(self):
+        """Positions evaluated by the heuristic or as finished games."""
+        return int(self.counters[STAT_LEAVES])
 
-    # Adjust depth based on round
-    if round_idx >= 50:
-        depth += 10  # Endgame solver
-    elif round_idx > 40:
-        depth += 2
-    elif round_idx > 30:
-        depth += 1
+    @property
+    def cutoffs(self):
+        """Beta cutoffs."""
+        return int(self.counters[STAT_CUTOFFS])
 
-    _, best_move = _minimax(board, black_score, white_score, state, state, depth, -float("inf"), float("inf"))
-    return best_move
+    @property
+    def expanded(self):
+        """Positions whose moves were searched."""
+        return int(self.counters[STAT_EXPANDED])
 
+    @property
+    def branching_factor(self):
+        """Average number of moves searched per expanded position."""
+        expanded = self.counters[STAT_EXPANDED]
+        return float(self.counters[STAT_CHILDREN] / expanded) if expanded else 0.0
 
+    def as_dict(self):
+        """Returns the counters and the latest depth, score and time by name."""
+        return {
+            "nodes": self.nodes,
+            "leaves": self.leaves,
+            "cutoffs": self.cutoffs,
+            "expanded": self.expanded,
+            "children": int(self.counters[STAT_CHILDREN]),
+            "depth": self.depth,
+            "endgame": self.endgame,
+            "score": self.score,
+            "elapsed": self.elapsed,
+            "branching_factor": self.branching_factor,
+        }
+
+
+@njit
 def _minimax(
-    board: np.ndarray,
+    boards: np.ndarray,
+    ply: int,
     black_score: int,
     white_score: int,
     state: int,
+    positional: int,
+    position_hash: np.uint64,
     my_turn: int,
     depth: int,
-    alpha: float,
-    beta: float,
-) -> Tuple[float, Tuple[int, int]]:
-    """Minimax with alpha-beta pruning. Returns (value, (x, y))."""
+    alpha: int,
+    beta: int,
+    table: np.ndarray,
+    replacement: int,
+    counters: np.ndarray,
+):
+    """Minimax with alpha-beta pruning on boards[ply]. Returns (value, y * 8 + x of the best move).
+
+    The children are played on boards[ply + 1]. `positional` is the REWARDS sum of the black discs
+    minus that of the white discs and `position_hash` the `zobrist_hash` of the position, both kept
+    up to date per move. The search is counted into `counters`.
+    """
 
+    counters[STAT_NODES] += 1
     if depth == 0 or state not in (STATE_BLACK_TURN, STATE_WHITE_TURN):
-        return _evaluate_board(board, black_score, white_score, state, my_turn), (-1, -1)
-
-    moves = [tuple(move) for move in get_valid_moves(board, state)]
-    if not moves:
-        return _evaluate_board(board, black_score, white_score, state, my_turn), (-1, -1)
-
-    best_move = moves[0]
-    best_value = float("-inf") if state == my_turn else float("inf")
-
-    for move in moves:
-        # Create a new game state
-        sim_board = board.copy()
-        sim_black_score = black_score
-        sim_white_score = white_score
-        sim_state = state
-        sim_board, sim_black_score, sim_white_score, sim_state, success = make_move(
-            sim_board, sim_black_score, sim_white_score, sim_state, move[0], move[1]
-        )
-        if not success:
-            continue  # Skip invalid moves
+        counters[STAT_LEAVES] += 1
+        return _evaluate_board(state, my_turn, positional), -1
 
-        value = _minimax(sim_board, sim_black_score, sim_white_score, sim_state, my_turn, depth - 1, alpha, beta)[0]
+    # Values are relative to my_turn, so positions searched for white are keyed apart from black
+    board = boards[ply]
+    key = position_hash
+    if my_turn == STATE_WHITE_TURN:
+        key ^= np.uint64(0xFFFFFFFFFFFFFFFF)
+    found, entry_depth, bound, value, move_x, move_y = tt_probe(table, key)
+    hash_move = -1
+    if found:
+        hash_move = move_y * 8 + move_x
+        if entry_depth >= depth:
+            if bound == BOUND_EXACT:
+                return value, hash_move
+            elif bound == BOUND_LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value, hash_move
+    alpha_start, beta_start = alpha, beta
+
+    best_move = -1
+    best_value = -SCORE_INF if state == my_turn else SCORE_INF
+    child_board = boards[ply + 1]
+
+    # The move stored in the table goes first, then the valid cells in board order
+    for i in range(-1, 64):
+        if i == -1:
+            if hash_move < 0 or board[hash_move >> 3, hash_move & 7] != CELL_VALID:
+                continue
+            move = hash_move
+        elif i == hash_move or board[i >> 3, i & 7] != CELL_VALID:
+            continue
+        else:
+            move = i
+        if best_move == -1:
+            best_move = move
+
+        child_board[:, :] = board
+        positional_delta, hash_delta = _move_delta(board, state, move & 7, move >> 3)
+        _, child_black_score, child_white_score, child_state, _ = make_move(
+            child_board, black_score, white_score, state, move & 7, move >> 3
+        )
+        child_hash = position_hash ^ hash_delta
+        if (child_state == STATE_WHITE_TURN) != (state == STATE_WHITE_TURN):
+            child_hash ^= ZOBRIST_WHITE_TURN
+        value, _ = _minimax(
+            boards,
+            ply + 1,
+            child_black_score,
+            child_white_score,
+            child_state,
+            positional + positional_delta,
+            child_hash,
+            my_turn,
+            depth - 1,
+            alpha,
+            beta,
+            table,
+            replacement,
+            counters,
+        )
+        counters[STAT_CHILDREN] += 1
 
         if state == my_turn:
             if value > best_value:
@@ -105,30 +302,113 @@ def _minimax(
             beta = min(beta, best_value)
 
         if alpha >= beta:
+            counters[STAT_CUTOFFS] += 1
             break
 
+    if best_move == -1:
+        counters[STAT_LEAVES] += 1
+        return _evaluate_board(state, my_turn, positional), -1
+    counters[STAT_EXPANDED] += 1
+
+    if best_value <= alpha_start:
+        bound = BOUND_UPPER
+    elif best_value >= beta_start:
+        bound = BOUND_LOWER
+    else:
+        bound = BOUND_EXACT
+    tt_store(table, key, depth, bound, best_value, best_move & 7, best_move >> 3, replacement)
     return best_value, best_move
 
 
 @njit
-def _evaluate_board(board: np.ndarray, black_score: int, white_score: int, state: int, my_turn: int) -> float:
-    """Evaluate the board using the REWARDS matrix with Numba-compatible loops."""
-    
+def _evaluate_board(state: int, my_turn: int, positional: int) -> int:
+    """Evaluate the board from the running REWARDS difference between black and white."""
+
     if state == STATE_BLACK_WON:
-        return np.float64(np.inf) if my_turn == STATE_BLACK_TURN else np.float64(-np.inf)
+        return SCORE_INF if my_turn == STATE_BLACK_TURN else -SCORE_INF
     if state == STATE_WHITE_WON:
-        return np.float64(np.inf) if my_turn == STATE_WHITE_TURN else np.float64(-np.inf)
+        return SCORE_INF if my_turn == STATE_WHITE_TURN else -SCORE_INF
     if state == STATE_DRAW:
-        return 0.0
+        return 0
+
+    return positional if my_turn == STATE_BLACK_TURN else -positional
+
+
+@njit(parallel=True)
+def evaluate_batch(boards: np.ndarray, my_turns: np.ndarray) -> np.ndarray:
+    """Evaluate an (N, 8, 8) stack of boards for the N players in `my_turns` in parallel.
+
+    A board where neither player can move is scored as a finished game, like core.minimax.evaluate_batch
+    does. The moves are worked out from the discs, the boards don't need their valid cells marked.
+    """
+    rewards = np.zeros(boards.shape[0], dtype=np.int64)
+    for i in prange(boards.shape[0]):
+        positional = 0
+        black = 0
+        white = 0
+        for y in range(8):
+            for x in range(8):
+                cell = boards[i, y, x]
+                if cell == CELL_BLACK:
+                    positional += REWARDS[y, x]
+                    black += 1
+                elif cell == CELL_WHITE:
+                    positional -= REWARDS[y, x]
+                    white += 1
 
-    reward = np.float64(0.0)
+        if not _either_can_move(boards[i]):
+            if black > white:
+                positional = SCORE_INF
+            elif black < white:
+                positional = -SCORE_INF
+            else:
+                positional = 0
+        rewards[i] = positional if my_turns[i] == STATE_BLACK_TURN else -positional
+    return rewards
+
+
+@njit
+def _either_can_move(board: np.ndarray) -> bool:
+    """Check if black or white has a move on the board, ignoring the valid cell marks."""
+    for y in range(8):
+        for x in range(8):
+            if board[y, x] == CELL_EMPTY or board[y, x] == CELL_VALID:
+                if flips_any(board, x, y, CELL_BLACK, CELL_WHITE) or flips_any(board, x, y, CELL_WHITE, CELL_BLACK):
+                    return True
+    return False
+
+
+@njit
+def _positional_score(board: np.ndarray) -> int:
+    """Sum REWARDS over the black discs minus the white discs."""
+    score = 0
     for y in range(8):
         for x in range(8):
             if board[y, x] == CELL_BLACK:
-                reward += REWARDS[y, x] if my_turn == STATE_BLACK_TURN else -REWARDS[y, x]
+                score += REWARDS[y, x]
             elif board[y, x] == CELL_WHITE:
-                reward += REWARDS[y, x] if my_turn == STATE_WHITE_TURN else -REWARDS[y, x]
-    return reward
+                score -= REWARDS[y, x]
+    return score
+
+
+@njit
+def _move_delta(board: np.ndarray, state: int, move_x: int, move_y: int):
+    """Change of the black minus white REWARDS sum and of the discs part of the Zobrist hash caused by a move.
+
+    Both come from the placed and flipped cells only. Returns (REWARDS change, hash bits to XOR in).
+    """
+    player = CELL_BLACK if state == STATE_BLACK_TURN else CELL_WHITE
+    opponent = CELL_WHITE if state == STATE_BLACK_TURN else CELL_BLACK
+    delta = REWARDS[move_y, move_x]
+    hash_delta = ZOBRIST[player, move_y * 8 + move_x]
+    for d in range(8):
+        dx, dy = DIRECTIONS[d, 0], DIRECTIONS[d, 1]
+        x, y = move_x, move_y
+        for _ in range(count_flips_in_direction(board, move_x, move_y, dx, dy, player, opponent)):
+            x, y = x + dx, y + dy
+            delta += 2 * REWARDS[y, x]  # a flipped disc leaves the opponent and joins the player
+            hash_delta ^= ZOBRIST[player, y * 8 + x] ^ ZOBRIST[opponent, y * 8 + x]
+    return (delta if player == CELL_BLACK else -delta), hash_delta
 
 
 @njit
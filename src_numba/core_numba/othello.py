@@ -1,3 +1,5 @@
+import random
+
 import numpy as np
 from numba import njit
 
@@ -28,6 +30,14 @@ DIRECTIONS = np.array(
     dtype=np.int32,
 )
 
+# Zobrist keys indexed by [cell, y * 8 + x] and for white being the player to move
+# drawn in the same order and with the same seed as core.othello, so both backends hash alike
+_zobrist_random = random.Random(20240612)
+ZOBRIST = np.zeros((4, 64), dtype=np.uint64)
+ZOBRIST[CELL_BLACK] = [_zobrist_random.getrandbits(64) for _ in range(64)]
+ZOBRIST[CELL_WHITE] = [_zobrist_random.getrandbits(64) for _ in range(64)]
+ZOBRIST_WHITE_TURN = np.uint64(_zobrist_random.getrandbits(64))
+
 
 @njit
 def init_game():
@@ -44,6 +54,28 @@ def init_game():
     return board, 2, 2, STATE_BLACK_TURN
 
 
+def init_position(black: int, white: int, state: int):
+    """Set up the position given by bitboards with bit y * 8 + x per cell.
+
+    Passes or ends the game if the player of `state` can't move. Returns (board, black_score, white_score, state).
+    """
+    if state not in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+        raise ValueError(f"Can't set up position: {state} is not a turn")
+    if black & white:
+        raise ValueError("Can't set up position: Cells are both black and white")
+    board = np.zeros((8, 8), dtype=np.uint8)
+    for index in range(64):
+        if black >> index & 1:
+            board[index >> 3, index & 7] = CELL_BLACK
+        elif white >> index & 1:
+            board[index >> 3, index & 7] = CELL_WHITE
+    previous = STATE_WHITE_TURN if state == STATE_BLACK_TURN else STATE_BLACK_TURN
+    board, black_score, white_score, state, _ = update_state(
+        board, black.bit_count(), white.bit_count(), previous
+    )
+    return board, black_score, white_score, state
+
+
 @njit
 def make_move(
     board: np.ndarray,
@@ -64,11 +96,16 @@ def make_move(
     opponent = CELL_WHITE if state == STATE_BLACK_TURN else CELL_BLACK
     board[move_y, move_x] = player
 
-    # Flip cells and update scores incrementally
-    flipped = get_flipped_cells(board, move_x, move_y, player, opponent)
-    num_flipped = flipped.shape[0]
-    for x, y in flipped:
-        board[y, x] = player
+    # Flip cells in place direction by direction and update scores incrementally
+    num_flipped = 0
+    for d in range(8):
+        dx, dy = DIRECTIONS[d, 0], DIRECTIONS[d, 1]
+        count = count_flips_in_direction(board, move_x, move_y, dx, dy, player, opponent)
+        x, y = move_x, move_y
+        for _ in range(count):
+            x, y = x + dx, y + dy
+            board[y, x] = player
+        num_flipped += count
 
     # Update scores: +1 for the new piece, +num_flipped for flipped pieces
     if player == CELL_BLACK:
@@ -86,18 +123,61 @@ def make_move(
 def get_valid_moves(board: np.ndarray, state: np.int32):
     """Return valid moves as a NumPy array of [x, y] coordinates."""
 
+    valid_moves = np.zeros((64, 2), dtype=np.int32)
+    count = valid_moves_into(board, state, valid_moves)
+    return valid_moves[:count]
+
+
+@njit
+def valid_moves_into(board: np.ndarray, state: np.int32, out: np.ndarray):
+    """Write the valid moves as [x, y] rows into the caller's (64, 2) buffer and return how many there are."""
+
     if state not in (STATE_BLACK_TURN, STATE_WHITE_TURN):
-        return np.zeros((0, 2), dtype=np.int32)
+        return 0
 
-    valid_moves = np.zeros((64, 2), dtype=np.int32)
     count = 0
     for y in range(8):
         for x in range(8):
             if board[y, x] == CELL_VALID:
-                valid_moves[count, 0] = x
-                valid_moves[count, 1] = y
+                out[count, 0] = x
+                out[count, 1] = y
                 count += 1
-    return valid_moves[:count]
+    return count
+
+
+@njit
+def random_valid_cell(board: np.ndarray, rng: np.uint64):
+    """Return the index y * 8 + x of a random valid cell, or -1 if there is none, and the new rng. Allocates nothing.
+
+    The cell is drawn from the SplitMix64 state `rng`.
+    """
+    count = 0
+    for y in range(8):
+        for x in range(8):
+            if board[y, x] == CELL_VALID:
+                count += 1
+    if count == 0:
+        return -1, rng
+
+    rng, value = splitmix64(rng)
+    pick = int(value % np.uint64(count))
+    for y in range(8):
+        for x in range(8):
+            if board[y, x] == CELL_VALID:
+                if pick == 0:
+                    return y * 8 + x, rng
+                pick -= 1
+    return -1, rng
+
+
+@njit
+def splitmix64(state: np.uint64):
+    """Advance a SplitMix64 generator. Returns (new state, random 64-bit value)."""
+    state = state + np.uint64(0x9E3779B97F4A7C15)
+    value = state
+    value = (value ^ (value >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    value = (value ^ (value >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return state, value ^ (value >> np.uint64(31))
 
 
 @njit
@@ -108,107 +188,102 @@ def update_state(
     state: np.int32,
 ):
     """Update turn, valid cells, and game state. Returns (board, black_score, white_score, state, success)."""
-    # Check if game is over
-    if is_full(board) or black_score == 0 or white_score == 0:
-        if black_score > white_score:
-            return board, black_score, white_score, STATE_BLACK_WON, 1
-        elif black_score < white_score:
-            return board, black_score, white_score, STATE_WHITE_WON, 1
-        else:
-            return board, black_score, white_score, STATE_DRAW, 1
+    # Check if game is over, make_move keeps the scores so a full board needs no scan
+    if black_score + white_score == 64 or black_score == 0 or white_score == 0:
+        return board, black_score, white_score, final_state(black_score, white_score), 1
 
     # Switch turn and update valid cells
     next_state = STATE_WHITE_TURN if state == STATE_BLACK_TURN else STATE_BLACK_TURN
-    board = update_valid_cells(board, next_state)
-
-    # Check if there are valid moves
-    valid_moves = get_valid_moves(board, next_state)
-    if valid_moves.shape[0] == 0:
+    if mark_valid_cells(board, next_state) == 0:
         # No valid moves, switch turn again
         next_state = STATE_WHITE_TURN if next_state == STATE_BLACK_TURN else STATE_BLACK_TURN
-        board = update_valid_cells(board, next_state)
-        valid_moves = get_valid_moves(board, next_state)
-        if valid_moves.shape[0] == 0:
+        if mark_valid_cells(board, next_state) == 0:
             # No valid moves for either player, game over
-            if black_score > white_score:
-                return board, black_score, white_score, STATE_BLACK_WON, 1
-            elif black_score < white_score:
-                return board, black_score, white_score, STATE_WHITE_WON, 1
-            else:
-                return board, black_score, white_score, STATE_DRAW, 1
+            return board, black_score, white_score, final_state(black_score, white_score), 1
 
     return board, black_score, white_score, next_state, 1
 
 
 @njit
-def is_full(board: np.ndarray):
-    """Check if the board is full."""
+def final_state(black_score: np.int32, white_score: np.int32):
+    """Return the state of a finished game with the given scores."""
+    if black_score > white_score:
+        return STATE_BLACK_WON
+    elif black_score < white_score:
+        return STATE_WHITE_WON
+    return STATE_DRAW
+
+
+@njit
+def zobrist_hash(board: np.ndarray, state: np.int32):
+    """Compute the Zobrist hash of a position."""
+    position_hash = ZOBRIST_WHITE_TURN if state == STATE_WHITE_TURN else np.uint64(0)
     for y in range(8):
         for x in range(8):
-            if board[y, x] in (CELL_EMPTY, CELL_VALID):
-                return 0
-    return 1
+            position_hash ^= ZOBRIST[board[y, x], y * 8 + x]
+    return position_hash
 
 
 @njit
-def update_valid_cells(board: np.ndarray, state: np.int32):
-    """Update valid cells for the current player's turn."""
+def bit_count(mask: np.uint64):
+    """Return the number of set bits of the mask."""
+    count = 0
+    while mask:
+        mask &= mask - np.uint64(1)
+        count += 1
+    return count
+
+
+@njit
+def mark_valid_cells(board: np.ndarray, state: np.int32):
+    """Mark the valid cells for the player of the given turn and return how many there are.
+
+    Only empty cells next to an opponent disc can flip anything, so the others skip the direction scans.
+    """
 
     player = CELL_BLACK if state == STATE_BLACK_TURN else CELL_WHITE
     opponent = CELL_WHITE if state == STATE_BLACK_TURN else CELL_BLACK
 
     # Clear and set valid cells in one pass
+    count = 0
     for y in range(8):
         for x in range(8):
             if board[y, x] == CELL_VALID:
                 board[y, x] = CELL_EMPTY
-            elif board[y, x] == CELL_EMPTY:
-                if len_flipped_cells(board, x, y, player, opponent):
+            if board[y, x] == CELL_EMPTY and touches(board, x, y, opponent):
+                if flips_any(board, x, y, player, opponent):
                     board[y, x] = CELL_VALID
-    return board
+                    count += 1
+    return count
 
 
 @njit
-def get_flipped_cells(
-    board: np.ndarray,
-    x: int,
-    y: int,
-    player: np.int32,
-    opponent: np.int32,
-):
-    """Get all cells that would be flipped by a move."""
-    flipped = np.zeros((64, 2), dtype=np.int32)
-    count = 0
-
-    for dx, dy in DIRECTIONS:
-        line_flipped = flipped_cells_in_direction(board, x, y, dx, dy, player, opponent)
-        for fx, fy in line_flipped:
-            flipped[count, 0] = fx
-            flipped[count, 1] = fy
-            count += 1
-
-    return flipped[:count]
+def touches(board: np.ndarray, x: int, y: int, cell: np.int32):
+    """Check if any of the 8 neighbours of (x, y) holds the given cell."""
+    for d in range(8):
+        nx, ny = x + DIRECTIONS[d, 0], y + DIRECTIONS[d, 1]
+        if 0 <= nx < 8 and 0 <= ny < 8 and board[ny, nx] == cell:
+            return 1
+    return 0
 
 
 @njit
-def len_flipped_cells(
+def flips_any(
     board: np.ndarray,
     x: int,
     y: int,
     player: np.int32,
     opponent: np.int32,
 ):
-    """Count flipped cells without storing them."""
-
-    count = 0
-    for dx, dy in DIRECTIONS:
-        line_flipped = flipped_cells_in_direction(board, x, y, dx, dy, player, opponent)
-        count += line_flipped.shape[0]
-    return count
+    """Check if a move flips anything, stopping at the first direction that does."""
+    for d in range(8):
+        if count_flips_in_direction(board, x, y, DIRECTIONS[d, 0], DIRECTIONS[d, 1], player, opponent):
+            return 1
+    return 0
 
 
 @njit
-def flipped_cells_in_direction(
+def count_flips_in_direction(
     board: np.ndarray,
     x: int,
     y: int,
@@ -217,18 +292,14 @@ def flipped_cells_in_direction(
     player: np.int32,
     opponent: np.int32,
 ):
-    """Get flipped cells in a specific direction."""
+    """Count the cells flipped in a specific direction without storing them."""
 
-    flipped = np.zeros((8, 2), dtype=np.int32)
     count = 0
     x, y = x + dx, y + dy
-
     while 0 <= x < 8 and 0 <= y < 8 and board[y, x] == opponent:
-        flipped[count, 0] = x
-        flipped[count, 1] = y
         count += 1
         x, y = x + dx, y + dy
 
     if not (0 <= x < 8 and 0 <= y < 8) or board[y, x] != player:
-        return flipped[:0]
-    return flipped[:count]
+        return 0
+    return count
@@ -0,0 +1,80 @@
+import numpy as np
+from numba import njit
+
+from .othello import CELL_BLACK, CELL_WHITE, STATE_WHITE_TURN, ZOBRIST, ZOBRIST_WHITE_TURN
+
+# A symmetry of the board is a number 0-7 whose bits select the steps applied in this order:
+# 4 transposes the board (x, y) -> (y, x), 1 mirrors it (x -> 7 - x) and 2 flips it (y -> 7 - y).
+# 0 is the identity, together they are the 8 rotations and reflections of the square.
+# The numbering and the canonical form are the same as in core.symmetry.
+
+
+def transform_move(move, symmetry: int):
+    """Return the cell (x, y) the symmetry moves the given cell to."""
+    x, y = int(move[0]), int(move[1])
+    if symmetry & 4:
+        x, y = y, x
+    if symmetry & 1:
+        x = 7 - x
+    if symmetry & 2:
+        y = 7 - y
+    return x, y
+
+
+def inverse_move(move, symmetry: int):
+    """Return the cell (x, y) the symmetry moves to the given cell, undoing `transform_move`."""
+    x, y = int(move[0]), int(move[1])
+    if symmetry & 2:
+        y = 7 - y
+    if symmetry & 1:
+        x = 7 - x
+    if symmetry & 4:
+        x, y = y, x
+    return x, y
+
+
+# Index y * 8 + x of the cell each symmetry moves every cell to, indexed by [symmetry, y * 8 + x]
+_moved = np.array([[transform_move((index & 7, index >> 3), symmetry) for index in range(64)] for symmetry in range(8)])
+SYMMETRY_CELLS = _moved[:, :, 1] * 8 + _moved[:, :, 0]
+
+
+@njit
+def canonical(board: np.ndarray):
+    """Return the (black, white) bitboards of the canonical form of the board and the symmetry that maps to it.
+
+    The canonical form is the transformed (black, white) pair that compares lowest, so all 8
+    orientations of a position share it.
+    """
+    best_black = np.uint64(0)
+    best_white = np.uint64(0)
+    best_symmetry = 0
+    for symmetry in range(8):
+        black = np.uint64(0)
+        white = np.uint64(0)
+        for index in range(64):
+            cell = board[index >> 3, index & 7]
+            if cell == CELL_BLACK:
+                black |= np.uint64(1) << np.uint64(SYMMETRY_CELLS[symmetry, index])
+            elif cell == CELL_WHITE:
+                white |= np.uint64(1) << np.uint64(SYMMETRY_CELLS[symmetry, index])
+        if symmetry == 0 or black < best_black or black == best_black and white < best_white:
+            best_black = black
+            best_white = white
+            best_symmetry = symmetry
+    return best_black, best_white, best_symmetry
+
+
+@njit
+def canonical_hash(board: np.ndarray, state: np.int32):
+    """Return the Zobrist hash of the canonical form of the position and the symmetry that maps to it.
+
+    Store moves for the key after `transform_move` and map them back with `inverse_move`.
+    """
+    black, white, symmetry = canonical(board)
+    position_hash = ZOBRIST_WHITE_TURN if state == STATE_WHITE_TURN else np.uint64(0)
+    for index in range(64):
+        if black >> np.uint64(index) & np.uint64(1):
+            position_hash ^= ZOBRIST[CELL_BLACK, index]
+        elif white >> np.uint64(index) & np.uint64(1):
+            position_hash ^= ZOBRIST[CELL_WHITE, index]
+    return position_hash, symmetry
@@ -0,0 +1,60 @@
+import numpy as np
+from numba import njit
+
+BOUND_EXACT = 1
+BOUND_LOWER = 2  # search failed high, the value is at least this
+BOUND_UPPER = 3  # search failed low, the value is at most this
+
+REPLACE_ALWAYS = 1  # a new entry always overwrites the slot
+REPLACE_DEPTH = 2  # a new entry overwrites the slot only if it is for the same position or searched as deep
+
+# One slot of the table, bound 0 marks an empty slot
+TT_ENTRY = np.dtype(
+    [
+        ("key", np.uint64),
+        ("depth", np.int32),
+        ("bound", np.int8),
+        ("move_x", np.int8),
+        ("move_y", np.int8),
+        ("value", np.int32),
+    ]
+)
+
+
+def new_table(size: int = 1 << 16) -> np.ndarray:
+    """Allocate an empty transposition table with the given number of entries."""
+    if size <= 0:
+        raise ValueError(f"Transposition table size must be positive: {size}")
+    return np.zeros(size, dtype=TT_ENTRY)
+
+
+@njit
+def tt_probe(table: np.ndarray, key: np.uint64):
+    """Look up a position. Returns (found, depth, bound, value, move_x, move_y)."""
+    entry = table[key % np.uint64(table.shape[0])]
+    if entry.bound == 0 or entry.key != key:
+        return 0, 0, 0, 0, -1, -1
+    return 1, entry.depth, entry.bound, entry.value, entry.move_x, entry.move_y
+
+
+@njit
+def tt_store(
+    table: np.ndarray,
+    key: np.uint64,
+    depth: int,
+    bound: int,
+    value: int,
+    move_x: int,
+    move_y: int,
+    replacement: int,
+):
+    """Store a search result for a position according to the replacement policy."""
+    entry = table[key % np.uint64(table.shape[0])]
+    if replacement == REPLACE_DEPTH and entry.bound != 0 and entry.key != key and entry.depth > depth:
+        return
+    entry.key = key
+    entry.depth = depth
+    entry.bound = bound
+    entry.value = value
+    entry.move_x = move_x
+    entry.move_y = move_y
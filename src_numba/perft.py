@@ -0,0 +1,66 @@
+import numpy as np
+from core_numba.othello import (
+    CELL_VALID,
+    STATE_BLACK_TURN,
+    STATE_WHITE_TURN,
+    init_position,
+    make_move,
+)
+from numba import njit
+
+# the move generation of the Numba backend, run_perft.py --backend numba counts it
+
+
+def perft(position: tuple[np.ndarray, int, int, int], depth: int) -> int:
+    """Counts the leaves of the game tree to the given depth, a pass is a ply of its own and a finished game a leaf.
+
+    The position is (board, black_score, white_score, state) as `parse_position` returns it.
+    """
+    board, black_score, white_score, state = position
+    boards = np.empty((max(depth, 1), 8, 8), dtype=np.uint8)
+    boards[0] = board
+    return _perft(boards, 0, black_score, white_score, state, depth)
+
+
+@njit
+def _perft(boards: np.ndarray, ply: int, black_score: np.int32, white_score: np.int32, state: np.int32, depth: int):
+    """Perft on boards[ply], making the moves on the next boards of the stack."""
+    if depth == 0 or state not in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+        return 1
+
+    board = boards[ply]
+    nodes = 0
+    if depth == 1:
+        # every move leads to exactly one leaf
+        for y in range(8):
+            for x in range(8):
+                if board[y, x] == CELL_VALID:
+                    nodes += 1
+        return nodes
+
+    child = boards[ply + 1]
+    for y in range(8):
+        for x in range(8):
+            if board[y, x] != CELL_VALID:
+                continue
+            child[:, :] = board
+            _, child_black_score, child_white_score, child_state, _ = make_move(
+                child, black_score, white_score, state, x, y
+            )
+            if child_state == state:  # the opponent has to pass
+                nodes += _perft(boards, ply + 1, child_black_score, child_white_score, child_state, depth - 2)
+            else:
+                nodes += _perft(boards, ply + 1, child_black_score, child_white_score, child_state, depth - 1)
+    return nodes
+
+
+def parse_position(board: str, player: str):
+    """Sets up a game from a board string of 64 cells X, O or - and the player to move, X or O.
+
+    Returns (board, black_score, white_score, state).
+    """
+    if len(board) != 64 or set(board) - set("XO-") or player not in ("X", "O"):
+        raise ValueError(f"Invalid position: {board} {player}")
+    black = sum(1 << index for index, cell in enumerate(board) if cell == "X")
+    white = sum(1 << index for index, cell in enumerate(board) if cell == "O")
+    return init_position(black, white, STATE_BLACK_TURN if player == "X" else STATE_WHITE_TURN)
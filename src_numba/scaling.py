@@ -0,0 +1,87 @@
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+from colorama import Fore, Style
+from core_numba.mcts import NodePool, seed_numba
+from core_numba.othello import STATE_BLACK_TURN, STATE_WHITE_TURN, get_valid_moves, init_game, make_move
+
+SCALING_ITERATIONS = 20000
+SCALING_POSITIONS = 4
+SCALING_PLIES = 20
+
+
+def thread_counts(maximum: int) -> list[int]:
+    """Returns the powers of two below the maximum thread count, then the maximum."""
+    counts = []
+    threads = 1
+    while threads < maximum:
+        counts.append(threads)
+        threads *= 2
+    return counts + [maximum]
+
+
+def scaling_positions(count: int, plies: int, seed: int) -> list[tuple[np.ndarray, int, int, int]]:
+    """Returns the start position and positions reached by random moves from it."""
+    rng = random.Random(seed)
+    positions = [init_game()]
+    while len(positions) < count:
+        board, black_score, white_score, state = init_game()
+        for _ in range(rng.randint(1, plies)):
+            moves = get_valid_moves(board, state)
+            if state not in (STATE_BLACK_TURN, STATE_WHITE_TURN) or moves.shape[0] == 0:
+                break
+            x, y = moves[rng.randrange(moves.shape[0])]
+            board, black_score, white_score, state, _ = make_move(board, black_score, white_score, state, x, y)
+        if state in (STATE_BLACK_TURN, STATE_WHITE_TURN):
+            positions.append((board, black_score, white_score, state))
+    return positions
+
+
+def run_scaling(
+    positions: list[tuple[np.ndarray, int, int, int]], iterations: int, counts: list[int], seed: int
+) -> list[tuple[int, float]]:
+    """Searches every position with every thread count and returns (threads, seconds per move).
+
+    Every search runs all its iterations, without stopping early.
+    """
+    tree = NodePool(iterations + 1)
+    board, black_score, white_score, state = positions[0]
+    for threads in counts:  # compile, and start the threads once, before the clock starts
+        tree.search(board, black_score, white_score, state, 100, threads=threads)
+
+    results = []
+    for threads in counts:
+        seed_numba(seed)
+        start_time = time.perf_counter()
+        for board, black_score, white_score, state in positions:
+            tree.search(board, black_score, white_score, state, iterations, threads=threads)
+        results.append((threads, (time.perf_counter() - start_time) / len(positions)))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure how tree-parallel MCTS scales with the number of threads.")
+    parser.add_argument("--iterations", type=int, default=SCALING_ITERATIONS, help="MCTS iterations per move")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="highest thread count")
+    parser.add_argument("--positions", type=int, default=SCALING_POSITIONS, help="positions searched")
+    parser.add_argument("--seed", type=int, default=0, help="seed the positions and searches are derived from")
+    args = parser.parse_args()
+
+    positions = scaling_positions(args.positions, SCALING_PLIES, args.seed)
+    counts = thread_counts(args.threads)
+    print(f"{Fore.MAGENTA}{args.iterations} iterations on {len(positions)} positions{Style.RESET_ALL}")
+    results = run_scaling(positions, args.iterations, counts, args.seed)
+    base = results[0][1]
+    for threads, seconds in results:
+        print(
+            f"{Fore.BLUE}{threads:>3} threads:{Style.RESET_ALL}"
+            f" {seconds * 1000:9.2f}ms per move  {args.iterations / seconds:12,.0f} iterations/s"
+            f"  speedup {base / seconds:5.2f}  efficiency {base / seconds / threads * 100:3.0f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the source trees are run as scripts from their own directory, import their packages the same way
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "src"), os.path.join(ROOT, "src_numba")]
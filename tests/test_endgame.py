@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from core.endgame import solve_endgame
+from core.othello import Othello, State
+
+
+def _exhaustive(game: Othello) -> int:
+    """Final disc difference of BLACK minus WHITE with best play, searching every move to the end."""
+    if game.state not in (State.BLACK_TURN, State.WHITE_TURN):
+        return game.black_score - game.white_score
+    values = []
+    for move in game.get_valid_moves():
+        game.make_move(move)
+        values.append(_exhaustive(game))
+        game.undo_move()
+    return max(values) if game.state == State.BLACK_TURN else min(values)
+
+
+def _endgame_position(empties: int, seed: int) -> Othello:
+    """Returns a random game with `empties` empty cells and a player to move."""
+    rng = random.Random(seed)
+    while True:
+        game = Othello()
+        while game.state in (State.BLACK_TURN, State.WHITE_TURN) and game.black_score + game.white_score < 64 - empties:
+            game.make_move(rng.choice(game.get_valid_moves()))
+        if game.state in (State.BLACK_TURN, State.WHITE_TURN):
+            return Othello.from_position(game.black, game.white, game.state)
+
+
+def _expected(game: Othello) -> tuple[int, list[tuple[int, int]]]:
+    """Returns the best final disc difference for the player to move and every move reaching it."""
+    sign = 1 if game.state == State.BLACK_TURN else -1
+    best_moves = []
+    for move in game.get_valid_moves():
+        game.make_move(move)
+        best_moves.append((sign * _exhaustive(game), move))
+        game.undo_move()
+    score = max(value for value, _ in best_moves)
+    return score, [move for value, move in best_moves if value == score]
+
+
+@pytest.mark.parametrize("empties", range(4, 9))
+def test_solve_endgame_matches_exhaustive_search(empties):
+    for seed in range(2):
+        game = _endgame_position(empties, seed)
+        score, moves = _expected(game)
+        assert solve_endgame(game) in [(score, move) for move in moves]
+        assert solve_endgame(game, exact=False)[0] == (score > 0) - (score < 0)
+
+
+@pytest.mark.parametrize("empties", range(4, 9))
+def test_numba_solve_endgame_matches_exhaustive_search(empties):
+    pytest.importorskip("numba")
+    from core_numba.endgame import solve_endgame as solve_numba
+    from core_numba.othello import init_position
+
+    for seed in range(2):
+        game = _endgame_position(empties, seed)
+        score, moves = _expected(game)
+        board, black_score, white_score, state = init_position(game.black, game.white, game.state.value)
+        assert solve_numba(board, black_score, white_score, state) in [(score, move) for move in moves]
+        assert solve_numba(board, black_score, white_score, state, exact=False)[0] == (score > 0) - (score < 0)
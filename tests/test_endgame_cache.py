@@ -0,0 +1,22 @@
+from core.endgame_cache import HEADER, MAGIC, MIN_SLOTS, SLOT, EndgameCache, merge_cache
+
+
+def test_merged_solutions_are_found(tmp_path):
+    path = str(tmp_path / "cache")
+    with EndgameCache(path, path + ".journal") as cache:
+        cache.record(5, 12, (3, 2))
+        cache.record(5 + MIN_SLOTS, -4, (7, 7))  # same first slot
+    assert merge_cache(path, [path + ".journal"]) == 2
+    with EndgameCache(path) as cache:
+        assert cache.lookup(5) == (12, (3, 2))
+        assert cache.lookup(5 + MIN_SLOTS) == (-4, (7, 7))
+        assert cache.lookup(6) is None
+
+
+def test_lookup_in_full_table_misses(tmp_path):
+    path = tmp_path / "cache"
+    slots = 4
+    path.write_bytes(HEADER.pack(MAGIC, slots) + b"".join(SLOT.pack(key, 0, 0) for key in range(1, slots + 1)))
+    with EndgameCache(str(path)) as cache:
+        assert cache.lookup(2) == (0, (0, 0))
+        assert cache.lookup(slots + 2) is None
@@ -0,0 +1,32 @@
+import random
+
+from core.mcts import MCTSPlayer
+from core.othello import Othello, State
+
+
+def _position_after(move: tuple[int, int]) -> Othello:
+    game = Othello()
+    game.make_move(move)
+    return Othello.from_position(game.black, game.white, game.state)
+
+
+def test_player_does_not_reuse_tree_of_other_position():
+    random.seed(0)
+    player = MCTSPlayer(50)
+    first = _position_after((3, 2))
+    player.move(first)
+    second = _position_after((5, 4))
+    assert first.history == second.history == []
+    assert player.move(second) in second.get_valid_moves()
+    assert second.state == State.WHITE_TURN
+
+
+def test_player_reuses_tree_of_same_game():
+    random.seed(0)
+    player = MCTSPlayer(50)
+    game = _position_after((3, 2))
+    move = player.move(game)
+    child = next(child for child in player.root.children if child.move == move)
+    game.make_move(move)
+    player.move(game)
+    assert player.root is child
@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+from core.minimax import _evaluate_board, search
+from core.othello import Othello, State
+from core.transposition import Replacement, TranspositionTable
+
+
+def _plain_minimax(game: Othello, my_turn: State, depth: int) -> int:
+    """Minimax without pruning or transposition table, the reference value of the search."""
+    if depth == 0 or game.state not in (State.BLACK_TURN, State.WHITE_TURN):
+        return _evaluate_board(game, my_turn)
+    values = []
+    for move in game.get_valid_moves():
+        game.make_move(move)
+        values.append(_plain_minimax(game, my_turn, depth - 1))
+        game.undo_move()
+    return max(values) if game.state == my_turn else min(values)
+
+
+def _random_position(rng: random.Random, plies: int) -> Othello:
+    game = Othello()
+    for _ in range(plies):
+        moves = game.get_valid_moves()
+        if not moves:
+            break
+        game.make_move(rng.choice(moves))
+    return game
+
+
+@pytest.mark.parametrize("size", [1 << 16, 64])
+@pytest.mark.parametrize("replacement", [Replacement.DEPTH, Replacement.ALWAYS])
+def test_search_with_table_matches_plain_minimax(size, replacement):
+    rng = random.Random(4)
+    for plies in (4, 12, 20, 28, 36, 44, 52):
+        game = _random_position(rng, plies)
+        if game.state not in (State.BLACK_TURN, State.WHITE_TURN):
+            continue
+        value, move = search(game, 3, TranspositionTable(size, replacement))
+        assert value == _plain_minimax(game, game.state, 3)
+        my_turn = game.state
+        game.make_move(move)
+        assert _plain_minimax(game, my_turn, 2) == value
@@ -0,0 +1,48 @@
+import random
+
+from core.othello import Othello, can_move, positional_score, valid_cells, zobrist_hash
+
+
+def _random_games(count: int, seed: int) -> list[Othello]:
+    """Returns `count` games played with random moves to random lengths, some of them finished."""
+    rng = random.Random(seed)
+    games = []
+    for _ in range(count):
+        game = Othello()
+        for _ in range(rng.randint(0, 60)):
+            moves = game.get_valid_moves()
+            if not moves:
+                break
+            game.make_move(rng.choice(moves))
+        games.append(game)
+    return games
+
+
+def test_can_move_matches_valid_cells():
+    for game in _random_games(200, 1):
+        assert can_move(game.black, game.white) == (valid_cells(game.black, game.white) != 0)
+        assert can_move(game.white, game.black) == (valid_cells(game.white, game.black) != 0)
+
+
+def test_undo_move_restores_every_field():
+    rng = random.Random(2)
+    for _ in range(20):
+        game = Othello()
+        snapshots = []
+        while game.get_valid_moves():
+            snapshots.append({**vars(game), "history": game.history.copy()})
+            game.make_move(rng.choice(game.get_valid_moves()))
+        while snapshots:
+            game.undo_move()
+            assert vars(game) == snapshots.pop()
+
+
+def test_incremental_hash_matches_recompute():
+    rng = random.Random(3)
+    for _ in range(20):
+        game = Othello()
+        while game.get_valid_moves():
+            game.make_move(rng.choice(game.get_valid_moves()))
+            assert game.hash == zobrist_hash(game.black, game.white, game.state)
+            assert game.black_positional == positional_score(game.black)
+            assert game.white_positional == positional_score(game.white)